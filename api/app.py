@@ -1,18 +1,21 @@
 import numpy as np
 import pandas as pd
-from flask import Flask, request, jsonify
+from flask import Flask, request, g, has_request_context
 from flask_cors import CORS, cross_origin
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import NearestNeighbors
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 from werkzeug.security import generate_password_hash, check_password_hash
-from sklearn.decomposition import TruncatedSVD
-from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+from scipy.sparse import csr_matrix, save_npz, load_npz
+from scipy.sparse.linalg import svds
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import sqlite3
 from contextlib import contextmanager
-from functools import wraps
+from functools import wraps, lru_cache
 import jwt
+import orjson
 from datetime import datetime, timedelta
 from urllib.parse import unquote
 import re
@@ -20,10 +23,22 @@ from collections import Counter
 from dotenv import load_dotenv
 import time
 import pickle
+import logging
+import threading
+import queue
+import hmac
+import hashlib
+import atexit
+from itertools import groupby, accumulate, islice
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables
 load_dotenv()
 
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger('bookquest.api')
+
 app = Flask(__name__)
 
 # Use environment variables for secrets
@@ -48,41 +63,112 @@ DB_PATH = os.path.join(basedir, 'readly.db')
 
 # Optimized file paths for preprocessed data
 PROCESSED_DATA_PATH = os.path.join(basedir, 'processed_data.pkl')
-FEATURES_PATH = os.path.join(basedir, 'features.pkl')
+FEATURES_PATH = os.path.join(basedir, 'features.npz')  # L2-normalized TF-IDF rows
 MODELS_PATH = os.path.join(basedir, 'models.pkl')
 
+# Bump whenever the model training pipeline changes so stale pickles are retrained
+MODEL_CACHE_VERSION = 9
+
 # Global variables for models - SYNCHRONOUS LOADING
-content_model = None
-collaborative_model = None
+collaborative_model = None  # item factors (top singular vectors) of user_item_matrix
 data = None
 user_item_matrix = None
+user_factors = None  # SVD projection of user_item_matrix, computed once per load
 book_features = None
 vectorizer = None
 models_loaded = False
 
+# Lookup structures derived from `data` after every (re)load
+title_index = {}  # lowercased title -> first row index
+title_search = ('', [])  # (lowercased titles joined by newlines, start offset of each title) for literal substring search
+book_columns = {}  # response field -> ndarray aligned with data rows
+genre_rank = {}  # genre -> row indices, best (popularity_score, rating) first
+genre_labels_lower = []  # (genre, lowercased genre) pairs in genre_rank order
+genre_top_books = {}  # genre -> formatted 'genre' recommendations for its first GENRE_TOP_N rows
+popularity_rank = None  # row index -> position in the global (popularity_score, rating) order
+popularity_order = None  # row indices by popularity_score, best first (ties keep row order)
+author_rows = {}  # author -> row indices, authors in order of first appearance
+author_names = []  # author_rows keys, in order
+author_search = ('', [])  # (lowercased author names joined by newlines, start offsets) in author_names order
+author_rank = None  # row index -> position in the global (rating, popularity_score) order
+_models_lock = threading.Lock()
+
+# Columns kept in memory once the models are ready; combined_features (and isbn in older caches) only feed training
+SERVED_COLUMNS = ['title', 'author', 'genre', 'year', 'publisher', 'rating', 'user_ratings',
+                  'popularity_score', 'reading_level', 'image', 'image_small', 'image_large']
+
+# /api/recommend/genre never returns more than this many books
+GENRE_TOP_N = 20
+
+# Bump whenever init_db() gains a table, index or migration
+SCHEMA_VERSION = 4
+
+# Schema facts resolved once by init_db() instead of on every request
+searches_has_user_id = False
+
+# Google Books lookups persisted in book_details_cache stay valid this long
+BOOK_DETAILS_CACHE_DAYS = int(os.getenv('BOOK_DETAILS_CACHE_DAYS', '30'))
+GOOGLE_DETAILS_CACHE_SIZE = 2048
+
+# Werkzeug hash spec for new passwords, e.g. 'scrypt:16384:8:1' or 'pbkdf2:sha256:600000';
+# stored hashes carry their own parameters, so changing this never breaks existing logins
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+
+# Successful password checks are remembered this long (0 disables) so repeat logins skip the KDF
+PASSWORD_CHECK_CACHE_SECONDS = int(os.getenv('PASSWORD_CHECK_CACHE_SECONDS', '300'))
+PASSWORD_CHECK_CACHE_SIZE = 1024
+
+# Decoded JWT claims are reused this long (never past the token's own expiry) so chatty clients skip re-verifying
+TOKEN_CACHE_SECONDS = 60
+TOKEN_CACHE_SIZE = 10000
+
 def get_current_timestamp():
-    """Get current timestamp as ISO string for SQLite"""
-    return datetime.now().isoformat()
+    """Get current timestamp as ISO string for SQLite, formatted once per request"""
+    if not has_request_context():
+        return datetime.now().isoformat()
+    if 'timestamp' not in g:
+        g.timestamp = datetime.now().isoformat()
+    return g.timestamp
+
+def ojsonify(obj, status=200):
+    """Build a JSON response with orjson instead of the stdlib encoder"""
+    return app.response_class(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY), status=status, mimetype='application/json')
+
+# Serialized bodies of responses that only change when the data is reloaded
+_response_cache = {}
+
+def cached_json_response(key, build):
+    """Serve the JSON body for key, building and serializing it only on the first request"""
+    body = _response_cache.get(key)
+    if body is None:
+        body = _response_cache[key] = orjson.dumps(build(), option=orjson.OPT_SERIALIZE_NUMPY)
+    return app.response_class(body, mimetype='application/json')
+
+# Keyword lists for the synthetic genre labels, compiled once into one alternation per
+# genre; the keywords are lowercase, so patterns run case-sensitively on lowercased text
+GENRE_KEYWORDS = {
+    'Mystery/Thriller': ['mystery', 'detective', 'murder', 'crime', 'investigation', 'thriller', 'suspense', 'police', 'criminal'],
+    'Romance': ['love', 'romance', 'heart', 'passion', 'wedding', 'bride', 'kiss', 'dating', 'relationship'],
+    'Fantasy': ['magic', 'wizard', 'dragon', 'fantasy', 'enchanted', 'spell', 'realm', 'fairy', 'mythical', 'quest'],
+    'Science Fiction': ['space', 'future', 'robot', 'sci-fi', 'alien', 'galaxy', 'time', 'technology', 'mars', 'star'],
+    'Horror': ['horror', 'ghost', 'dark', 'fear', 'nightmare', 'haunted', 'terror', 'vampire', 'zombie', 'evil'],
+    'Biography/Memoir': ['life', 'biography', 'memoir', 'story of', 'autobiography', 'true story', 'personal'],
+    'History': ['history', 'war', 'historical', 'century', 'battle', 'ancient', 'civilization', 'world war'],
+    'Children/Young Adult': ['children', 'kid', 'young', 'junior', 'teen', 'school', 'adventure', 'family'],
+    'Business/Self-Help': ['business', 'success', 'leadership', 'management', 'entrepreneur', 'self-help', 'guide'],
+    'Health/Fitness': ['health', 'fitness', 'diet', 'nutrition', 'exercise', 'wellness', 'medical']
+}
+_GENRE_PATTERNS = {
+    genre: re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+    for genre, keywords in GENRE_KEYWORDS.items()
+}
 
 def create_optimized_dataset():
     """Create and save optimized, smaller dataset for faster loading"""
-    print("🔄 PREPROCESSING: Creating optimized dataset...")
+    logger.info("🔄 PREPROCESSING: Creating optimized dataset...")
     start_time = time.time()
     
     try:
-        # Load full dataset in chunks to prevent memory issues
-        print("📊 Reading CSV in chunks...")
-        chunk_size = 50000
-        chunks = []
-        
-        for chunk in pd.read_csv(CSV_PATH, low_memory=False, chunksize=chunk_size):
-            chunks.append(chunk)
-            if len(chunks) * chunk_size >= 50000:  # Reduced to 50K for faster loading
-                break
-        
-        full_data = pd.concat(chunks, ignore_index=True)
-        print(f"📊 Loaded dataset: {len(full_data)} books")
-        
         # Map column names
         column_mapping = {
             'Book-Title': 'title',
@@ -91,10 +177,14 @@ def create_optimized_dataset():
             'Year-Of-Publication': 'year',
             'Image-URL-M': 'image',
             'Image-URL-S': 'image_small',
-            'Image-URL-L': 'image_large',
-            'ISBN': 'isbn'
+            'Image-URL-L': 'image_large'
         }
         
+        # Parse only the first 50K rows and only the mapped columns (ISBN is never used)
+        logger.info("📊 Reading CSV...")
+        full_data = pd.read_csv(CSV_PATH, usecols=list(column_mapping), nrows=50000, low_memory=False)
+        logger.info("📊 Loaded dataset: %s books", len(full_data))
+        
         full_data = full_data.rename(columns=column_mapping)
         
         # Clean the data
@@ -108,35 +198,20 @@ def create_optimized_dataset():
         sample_size = min(25000, len(full_data))  # Reduced for speed
         data = full_data.sample(n=sample_size, random_state=42).reset_index(drop=True)
         
-        print(f"📊 Selected {len(data)} representative books")
+        logger.info("📊 Selected %s representative books", len(data))
         
         # Add synthetic data
         np.random.seed(42)
         data['rating'] = np.random.uniform(3.0, 9.5, len(data)).round(1)
         data['user_ratings'] = np.random.randint(50, 500, len(data))
-        data['genre'] = 'General Fiction'
-        
-        # Optimized genre classification
-        genre_keywords = {
-            'Mystery/Thriller': ['mystery', 'detective', 'murder', 'crime', 'investigation', 'thriller', 'suspense', 'police', 'criminal'],
-            'Romance': ['love', 'romance', 'heart', 'passion', 'wedding', 'bride', 'kiss', 'dating', 'relationship'],
-            'Fantasy': ['magic', 'wizard', 'dragon', 'fantasy', 'enchanted', 'spell', 'realm', 'fairy', 'mythical', 'quest'],
-            'Science Fiction': ['space', 'future', 'robot', 'sci-fi', 'alien', 'galaxy', 'time', 'technology', 'mars', 'star'],
-            'Horror': ['horror', 'ghost', 'dark', 'fear', 'nightmare', 'haunted', 'terror', 'vampire', 'zombie', 'evil'],
-            'Biography/Memoir': ['life', 'biography', 'memoir', 'story of', 'autobiography', 'true story', 'personal'],
-            'History': ['history', 'war', 'historical', 'century', 'battle', 'ancient', 'civilization', 'world war'],
-            'Children/Young Adult': ['children', 'kid', 'young', 'junior', 'teen', 'school', 'adventure', 'family'],
-            'Business/Self-Help': ['business', 'success', 'leadership', 'management', 'entrepreneur', 'self-help', 'guide'],
-            'Health/Fitness': ['health', 'fitness', 'diet', 'nutrition', 'exercise', 'wellness', 'medical']
-        }
         
-        # Apply genre classification using both title and author
-        for genre, keywords in genre_keywords.items():
-            for keyword in keywords:
-                title_mask = data['title'].str.contains(keyword, case=False, na=False)
-                author_mask = data['author'].str.contains(keyword, case=False, na=False)
-                combined_mask = title_mask | author_mask
-                data.loc[combined_mask, 'genre'] = genre
+        # Apply genre classification to title and author in one pass per genre: both
+        # fields are lowercased once into a newline-joined string, which no keyword can
+        # match across (and plain matching beats re.IGNORECASE on every row).
+        # Later genres take precedence, so the conditions go to np.select in reverse order.
+        searchable = (data['title'].fillna('') + '\n' + data['author'].fillna('')).str.lower()
+        genre_masks = [searchable.str.contains(pattern) for pattern in _GENRE_PATTERNS.values()]
+        data['genre'] = np.select(genre_masks[::-1], list(_GENRE_PATTERNS)[::-1], default='General Fiction')
         
         # Create reading difficulty level
         data['reading_level'] = np.random.choice(['Beginner', 'Intermediate', 'Advanced'], 
@@ -146,122 +221,218 @@ def create_optimized_dataset():
         data['popularity_score'] = (data['rating'] * 0.7 + 
                                   (data['user_ratings'] / data['user_ratings'].max()) * 100 * 0.3)
         
-        # Create combined features for content-based filtering
-        data['combined_features'] = (
-            data['title'].fillna('') + ' ' + 
-            data['author'].fillna('') + ' ' + 
-            data['genre'].fillna('') + ' ' +
-            data['publisher'].fillna('') + ' ' +
-            data['reading_level'].fillna('')
-        )
+        # Create combined features for content-based filtering in one pass over the
+        # columns instead of four chained Series concatenations
+        feature_columns = [data[col].fillna('').to_numpy() for col in ['title', 'author', 'genre', 'publisher', 'reading_level']]
+        data['combined_features'] = [' '.join(values) for values in zip(*feature_columns)]
         
         # Save processed data
         with open(PROCESSED_DATA_PATH, 'wb') as f:
             pickle.dump(data, f)
         
-        print(f"✅ PREPROCESSING: Saved optimized dataset in {time.time() - start_time:.2f}s")
+        logger.info("✅ PREPROCESSING: Saved optimized dataset in %.2fs", time.time() - start_time)
         return data
         
     except Exception as e:
-        print(f"❌ PREPROCESSING ERROR: {e}")
+        logger.exception("❌ PREPROCESSING ERROR")
         return None
 
 def load_models_sync():
-    """Load all models and data SYNCHRONOUSLY - NO THREADING"""
-    global content_model, collaborative_model, data, user_item_matrix, book_features, vectorizer
-    global models_loaded
+    """Load all models and data once; later calls return immediately"""
+    # Fast path: no locking once the models are in memory
+    if models_loaded:
+        return True
+    
+    with _models_lock:
+        if models_loaded:
+            return True
+        return _load_models()
+
+def is_cache_fresh(*paths):
+    """Check that every cache file exists and is newer than the source CSV"""
+    if not all(os.path.exists(path) for path in paths):
+        return False
+    
+    csv_mtime = os.path.getmtime(CSV_PATH) if os.path.exists(CSV_PATH) else 0
+    return all(os.path.getmtime(path) >= csv_mtime for path in paths)
+
+def build_search_text(values_lower):
+    """Join lowercased strings into one text for str.find, with the start offset of each string"""
+    starts = list(accumulate((len(value) + 1 for value in values_lower[:-1]), initial=0)) if values_lower else []
+    return '\n'.join(values_lower), starts
+
+def iter_containing(search, needle):
+    """Positions of the joined strings that contain needle, in order, found with C-level str.find"""
+    text, starts = search
+    pos = text.find(needle)
+    while pos != -1:
+        item = bisect_right(starts, pos) - 1
+        end = starts[item + 1] - 1 if item + 1 < len(starts) else len(text)
+        if pos + len(needle) <= end:
+            yield item
+            # Skip the rest of this string; each one is reported once
+            pos = text.find(needle, end + 1)
+        else:
+            # The hit spans a separator (needle has a newline), keep looking
+            pos = text.find(needle, pos + 1)
+
+def build_lookup_indexes():
+    """Precompute per-book lookup structures used by the request handlers"""
+    global title_index, title_search, book_columns, genre_rank, genre_labels_lower, genre_top_books, popularity_rank, popularity_order
+    global author_rows, author_names, author_search, author_rank
+    
+    titles_lower = data['title'].astype(str).str.lower().tolist()
+    # Walk backwards so the first occurrence of a duplicated title wins, like a pandas scan would
+    title_index = {title: idx for idx, title in reversed(list(enumerate(titles_lower)))}
+    title_search = build_search_text(titles_lower)
+    
+    # Column arrays let result builders index by position instead of boxing a row Series
+    book_columns = {
+        'title': data['title'].astype(str).to_numpy(),
+        'author': data['author'].astype(str).to_numpy(),
+        'rating': data['rating'].to_numpy(np.float64),
+        'image': resolve_image_urls(data),
+        'genre': data['genre'].astype(str).to_numpy(),
+        'year': data['year'].to_numpy(np.int64),
+        'publisher': data['publisher'].astype(str).to_numpy(),
+        'popularity_score': data['popularity_score'].to_numpy(np.float64),
+        'reading_level': data['reading_level'].astype(str).to_numpy(),
+        'user_ratings': data['user_ratings'].to_numpy(np.int64)
+    }
+    popularity_order = np.argsort(-book_columns['popularity_score'], kind='stable')
+    
+    # Same order as nlargest(['popularity_score', 'rating']): lexsort is stable, so ties keep row order
+    order = np.lexsort((-book_columns['rating'], -book_columns['popularity_score']))
+    popularity_rank = np.empty_like(order)
+    popularity_rank[order] = np.arange(len(order))
+    genres_in_order = book_columns['genre'][order]
+    genre_rank = {genre: order[genres_in_order == genre] for genre in np.unique(genres_in_order)}
+    genre_labels_lower = [(genre, genre.lower()) for genre in genre_rank]
+    genre_top_books = {genre: format_book_recommendations(rows[:GENRE_TOP_N], 'genre', 0.85) for genre, rows in genre_rank.items()}
+    
+    # Author searches scan the distinct names once instead of every row
+    author_codes, authors = pd.factorize(book_columns['author'])
+    rows_by_author = np.argsort(author_codes, kind='stable')
+    author_rows = dict(zip(authors, np.split(rows_by_author, np.cumsum(np.bincount(author_codes))[:-1])))
+    author_names = list(author_rows)
+    author_search = build_search_text([author.lower() for author in author_names])
+    order = np.lexsort((-book_columns['popularity_score'], -book_columns['rating']))
+    author_rank = np.empty_like(order)
+    author_rank[order] = np.arange(len(order))
+
+def _load_models():
+    """Load all models and data SYNCHRONOUSLY (caller holds _models_lock)"""
+    global collaborative_model, data, user_item_matrix, book_features, vectorizer
+    global user_factors, models_loaded
     
     try:
-        print("🚀 SYNCHRONOUS LOADING: Starting model and data loading...")
+        logger.info("🚀 SYNCHRONOUS LOADING: Starting model and data loading...")
         start_time = time.time()
         
-        # Try to load preprocessed data first
-        if os.path.exists(PROCESSED_DATA_PATH):
-            print("📦 Loading preprocessed data...")
+        # Try to load preprocessed data first (rebuilt if Books.csv changed since)
+        data_is_cached = is_cache_fresh(PROCESSED_DATA_PATH)
+        if data_is_cached:
+            logger.info("📦 Loading preprocessed data...")
             with open(PROCESSED_DATA_PATH, 'rb') as f:
                 data = pickle.load(f)
-            print(f"✅ Loaded {len(data)} preprocessed books")
+            logger.info("✅ Loaded %s preprocessed books", len(data))
         else:
-            print("📊 Creating preprocessed data (first time)...")
+            logger.info("📊 Creating preprocessed data (first time)...")
             data = create_optimized_dataset()
             if data is None:
                 raise Exception("Failed to create dataset")
         
-        # Check if models are already saved
-        if os.path.exists(MODELS_PATH) and os.path.exists(FEATURES_PATH):
-            print("🤖 Loading pre-trained models...")
-            
+        # Saved models are only valid for the same dataset and training pipeline
+        model_data = None
+        if data_is_cached and is_cache_fresh(MODELS_PATH, FEATURES_PATH):
             with open(MODELS_PATH, 'rb') as f:
                 model_data = pickle.load(f)
-                content_model = model_data['content_model']
-                vectorizer = model_data['vectorizer']
-                collaborative_model = model_data.get('collaborative_model')
-                user_item_matrix = model_data.get('user_item_matrix')
+            if model_data.get('version') != MODEL_CACHE_VERSION:
+                logger.info("♻️ Saved models were built by an older pipeline, retraining...")
+                model_data = None
+        
+        if model_data is not None:
+            logger.info("🤖 Loading pre-trained models...")
+            
+            vectorizer = model_data['vectorizer']
+            collaborative_model = model_data.get('collaborative_model')
+            user_item_matrix = model_data.get('user_item_matrix')
             
-            with open(FEATURES_PATH, 'rb') as f:
-                book_features = pickle.load(f)
+            book_features = load_npz(FEATURES_PATH)
                 
-            print("✅ Pre-trained models loaded successfully!")
+            logger.info("✅ Pre-trained models loaded successfully!")
         else:
-            print("🔧 Training models (first time)...")
+            logger.info("🔧 Training models (first time)...")
             
-            # Create TF-IDF vectorizer (optimized)
-            print("🔧 Creating TF-IDF vectorizer...")
-            vectorizer = TfidfVectorizer(
+            # Create TF-IDF features with a stateless hashing pass (no vocabulary to learn)
+            logger.info("🔧 Creating TF-IDF vectorizer...")
+            vectorizer = HashingVectorizer(
+                n_features=2 ** 14,
                 stop_words='english',
-                max_features=3000,  # Reduced
                 ngram_range=(1, 2),  # Simplified
-                min_df=3,
-                max_df=0.9,
+                alternate_sign=False,
+                norm=None,
                 lowercase=True,
-                strip_accents='unicode'
+                strip_accents='unicode',
+                dtype=np.float32  # plenty for cosine ranking and halves the matrix size
             )
+            term_counts = vectorizer.transform(data['combined_features']).tocsc()
             
-            book_features = vectorizer.fit_transform(data['combined_features'])
-            print(f"📊 Created feature matrix: {book_features.shape}")
+            # Same pruning as before, applied to hashed columns: min_df=3, max_df=0.9, max_features=3000
+            doc_freq = np.diff(term_counts.indptr)
+            kept_terms = np.flatnonzero((doc_freq >= 3) & (doc_freq <= 0.9 * term_counts.shape[0]))
+            term_totals = np.asarray(term_counts.sum(axis=0)).ravel()
+            kept_terms = np.sort(kept_terms[np.argsort(-term_totals[kept_terms], kind='stable')[:3000]])
             
-            # Content-based model with optimized parameters
-            print("🤖 Training content-based recommendation model...")
-            content_model = NearestNeighbors(
-                metric='cosine', 
-                algorithm='brute', 
-                n_neighbors=min(15, len(data))  # Reduced neighbors
-            )
-            content_model.fit(book_features)
-            print("✅ Content-based model trained!")
+            book_features = TfidfTransformer().fit_transform(term_counts[:, kept_terms].tocsr()).astype(np.float32)
+            # Unit-length rows make cosine similarity a plain sparse dot product; normalized
+            # once here, so warm starts load the saved rows as-is
+            book_features = normalize(book_features, norm='l2', copy=False)
+            logger.info("📊 Created feature matrix: %s", book_features.shape)
+            # Content-based recommendations are sparse dot products against the
+            # L2-normalized book_features below; no neighbor index to fit
             
             # Create collaborative filtering model
-            print("🤝 Creating collaborative filtering model...")
+            logger.info("🤝 Creating collaborative filtering model...")
             try:
                 n_users = min(200, len(data))  # Reduced users
                 n_books = len(data)
                 
-                # Generate synthetic user-book interaction matrix
-                np.random.seed(42)
-                user_book_ratings = np.random.choice([0, 1, 2, 3, 4, 5], 
-                                                   size=(n_users, n_books), 
-                                                   p=[0.85, 0.03, 0.03, 0.06, 0.02, 0.01])
+                # Generate synthetic user-book interactions as sparse triplets: 15% of
+                # cells carry a 1-5 rating, so sample only those instead of a dense matrix.
+                # A local Generator leaves the global NumPy seed alone and samples without
+                # replacement without permuting every cell
+                rng = np.random.default_rng(42)
+                n_ratings = rng.binomial(n_users * n_books, 0.15)
+                rated_cells = rng.choice(n_users * n_books, size=n_ratings, replace=False)
+                ratings = rng.choice([1, 2, 3, 4, 5], 
+                                     size=n_ratings, 
+                                     p=np.array([0.03, 0.03, 0.06, 0.02, 0.01]) / 0.15)
                 
-                user_item_matrix = csr_matrix(user_book_ratings)
+                user_item_matrix = csr_matrix(
+                    (ratings, (rated_cells // n_books, rated_cells % n_books)),
+                    shape=(n_users, n_books),
+                    dtype=np.float32
+                )
                 
-                # Use SVD for dimensionality reduction
+                # Use SVD for dimensionality reduction: ARPACK works on the sparse matrix
+                # directly and returns the exact top 20 singular triplets
                 if user_item_matrix.shape[0] > 10 and user_item_matrix.shape[1] > 10:
-                    collaborative_model = TruncatedSVD(n_components=20, random_state=42)
-                    collaborative_model.fit(user_item_matrix)
-                    print("✅ Collaborative filtering model created successfully!")
+                    _, _, collaborative_model = svds(user_item_matrix, k=20, random_state=42)
+                    logger.info("✅ Collaborative filtering model created successfully!")
                 else:
-                    print("⚠️ Dataset too small for collaborative filtering")
+                    logger.warning("⚠️ Dataset too small for collaborative filtering")
                     collaborative_model = None
                     
             except Exception as e:
-                print(f"⚠️ Warning: Could not create collaborative filtering model: {e}")
+                logger.warning("⚠️ Warning: Could not create collaborative filtering model: %s", e)
                 collaborative_model = None
                 user_item_matrix = None
             
             # Save models for next startup
-            print("💾 Saving models for future startups...")
+            logger.info("💾 Saving models for future startups...")
             model_data = {
-                'content_model': content_model,
+                'version': MODEL_CACHE_VERSION,
                 'vectorizer': vectorizer,
                 'collaborative_model': collaborative_model,
                 'user_item_matrix': user_item_matrix
@@ -270,29 +441,54 @@ def load_models_sync():
             with open(MODELS_PATH, 'wb') as f:
                 pickle.dump(model_data, f)
             
-            with open(FEATURES_PATH, 'wb') as f:
-                pickle.dump(book_features, f)
+            # Raw CSR arrays load with no unpickling (uncompressed: load speed over disk size)
+            save_npz(FEATURES_PATH, book_features, compressed=False)
             
-            print("✅ Models saved successfully!")
+            logger.info("✅ Models saved successfully!")
+        
+        # User factors only change with the model, so project the rating matrix once here
+        if collaborative_model is not None and user_item_matrix is not None:
+            user_factors = user_item_matrix @ collaborative_model.T
+        else:
+            user_factors = None
+        
+        data = data[[col for col in SERVED_COLUMNS if col in data.columns]]
+        build_lookup_indexes()
+        # Memoized results refer to the previous data and models
+        _recommend_cached.cache_clear()
+        genre_response_body.cache_clear()
+        _response_cache.clear()
         
         models_loaded = True
         
         total_time = time.time() - start_time
-        print(f"🎉 SYNCHRONOUS LOADING: Complete in {total_time:.2f}s!")
-        print(f"📊 Ready with {len(data)} books and trained models!")
+        logger.info("🎉 SYNCHRONOUS LOADING: Complete in %.2fs!", total_time)
+        logger.info("📊 Ready with %s books and trained models!", len(data))
         
         return True
         
     except Exception as e:
-        print(f"❌ SYNCHRONOUS LOADING ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ SYNCHRONOUS LOADING ERROR")
         models_loaded = False
         return False
 
+def table_has_column(conn, table, column):
+    """Check whether a table has a column, stopping at the first match"""
+    # table_xinfo (unlike table_info) also lists generated columns
+    return any(row[1] == column for row in conn.execute(f'PRAGMA table_xinfo({table})'))
+
 def init_db():
     """Initialize SQLite database for analytics, user data, and authentication"""
+    global searches_has_user_id
     conn = sqlite3.connect(DB_PATH)
+    # WAL lets readers proceed while a writer commits; the mode persists in the file
+    conn.execute('PRAGMA journal_mode=WAL')
+    
+    # Warm start: the schema is already current, skip the DDL round trips
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+        searches_has_user_id = table_has_column(conn, 'searches', 'user_id')
+        conn.close()
+        return
     
     # Create users table for authentication
     conn.execute('''
@@ -336,6 +532,30 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
+    # Per-user favorite counts rolled up on write, so analytics never scans favorites
+    has_favorite_counts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'favorite_counts'"
+    ).fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS favorite_counts (
+            user_id INTEGER NOT NULL,
+            book_title TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, book_title)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_favorite_counts_user_count
+        ON favorite_counts (user_id, count DESC)
+    ''')
+    if not has_favorite_counts:
+        conn.execute('''
+            INSERT INTO favorite_counts (user_id, book_title, count)
+            SELECT user_id, book_title, COUNT(*)
+            FROM favorites
+            WHERE user_id IS NOT NULL AND book_title IS NOT NULL
+            GROUP BY user_id, book_title
+        ''')
     conn.execute('''
         CREATE TABLE IF NOT EXISTS user_preferences (
             id INTEGER PRIMARY KEY,
@@ -368,17 +588,177 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users (id)
         )
     ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_details_cache (
+            title TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            fetched_at TEXT NOT NULL
+        )
+    ''')
+    
+    # Titles are matched case- and whitespace-insensitively through a generated
+    # book_title_norm column, so one unique index per user backs both lookups and UPSERTs
+    for table in ('ratings', 'favorites'):
+        if not table_has_column(conn, table, 'book_title_norm'):
+            # Keep each user's newest row of any titles that only differ by case or spacing
+            # (rows without a user never conflict: the unique index treats NULLs as distinct)
+            conn.execute(f'''
+                DELETE FROM {table} WHERE user_id IS NOT NULL AND id NOT IN (
+                    SELECT MAX(id) FROM {table} GROUP BY user_id, lower(trim(book_title))
+                )
+            ''')
+            conn.execute(f'''
+                ALTER TABLE {table} ADD COLUMN book_title_norm TEXT
+                GENERATED ALWAYS AS (lower(trim(book_title))) VIRTUAL
+            ''')
+            if table == 'favorites':
+                conn.execute('DELETE FROM favorite_counts')
+                conn.execute('''
+                    INSERT INTO favorite_counts (user_id, book_title, count)
+                    SELECT user_id, book_title, COUNT(*)
+                    FROM favorites
+                    WHERE user_id IS NOT NULL AND book_title IS NOT NULL
+                    GROUP BY user_id, book_title
+                ''')
+    conn.execute('DROP INDEX IF EXISTS idx_ratings_user_title')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_ratings_user_norm
+        ON ratings (user_id, book_title_norm)
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_favorites_user_norm
+        ON favorites (user_id, book_title_norm)
+    ''')
+    # Lets the favorites list read a user's newest rows in index order instead of sorting them
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_favorites_user_time
+        ON favorites (user_id, timestamp DESC)
+    ''')
+    # Every book view looks up the previous view_count by title
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_book_analytics_title
+        ON book_analytics (book_title)
+    ''')
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
     conn.commit()
+    
+    searches_has_user_id = table_has_column(conn, 'searches', 'user_id')
     conn.close()
 
+# Idle connections reused across requests instead of reconnecting every time
+_db_pool = queue.SimpleQueue()
+
+def open_db_connection():
+    """Open a connection suitable for the shared pool"""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
 @contextmanager
 def get_db_connection():
-    """Database connection context manager"""
-    conn = sqlite3.connect(DB_PATH)
+    """Database connection context manager backed by a pool of reusable connections"""
+    try:
+        conn = _db_pool.get_nowait()
+    except queue.Empty:
+        conn = open_db_connection()
     try:
         yield conn
     finally:
-        conn.close()
+        try:
+            # Never hand the next caller a half-finished transaction
+            if conn.in_transaction:
+                conn.rollback()
+            _db_pool.put(conn)
+        except sqlite3.Error:
+            conn.close()
+
+# (stored hash, keyed password digest) -> expiry; only successes are cached, and the
+# per-process key means no reusable password digest is ever kept in memory
+_password_check_cache = {}
+_password_check_key = os.urandom(32)
+_password_check_lock = threading.Lock()
+
+def verify_password(password_hash, password):
+    """check_password_hash with a short-lived cache of successful verifications"""
+    if PASSWORD_CHECK_CACHE_SECONDS <= 0:
+        return check_password_hash(password_hash, password)
+    
+    # A changed password changes the stored hash, which retires the old entry by itself
+    cache_key = (password_hash, hmac.new(_password_check_key, password.encode(), hashlib.sha256).digest())
+    now = time.monotonic()
+    with _password_check_lock:
+        expires_at = _password_check_cache.get(cache_key)
+    if expires_at is not None and expires_at > now:
+        return True
+    
+    if not check_password_hash(password_hash, password):
+        return False
+    
+    with _password_check_lock:
+        if len(_password_check_cache) >= PASSWORD_CHECK_CACHE_SIZE:
+            # Entries are inserted in expiry order, so the first one is the oldest
+            del _password_check_cache[next(iter(_password_check_cache))]
+        _password_check_cache.pop(cache_key, None)
+        _password_check_cache[cache_key] = now + PASSWORD_CHECK_CACHE_SECONDS
+    return True
+
+# Analytics rows are queued by request handlers and written in batches by one background
+# thread, so no request waits on an INSERT + commit. Writes are best effort, as before.
+ANALYTICS_BATCH_SIZE = 200
+ANALYTICS_FLUSH_SECONDS = 0.5
+_analytics_queue = queue.SimpleQueue()
+_analytics_writer_thread = None
+_analytics_writer_pid = None  # process that started the writer (threads do not survive fork)
+_analytics_writer_lock = threading.Lock()
+
+def queue_analytics_write(sql, params):
+    """Queue an analytics statement for the background writer"""
+    global _analytics_writer_thread, _analytics_writer_pid
+    if _analytics_writer_pid != os.getpid():
+        with _analytics_writer_lock:
+            if _analytics_writer_pid != os.getpid():
+                _analytics_writer_thread = threading.Thread(target=_analytics_writer, name='analytics-writer', daemon=True)
+                _analytics_writer_thread.start()
+                _analytics_writer_pid = os.getpid()
+    _analytics_queue.put((sql, params))
+
+def _analytics_writer():
+    """Drain the analytics queue, writing up to ANALYTICS_BATCH_SIZE rows per transaction; None stops it"""
+    stopping = False
+    while not stopping:
+        item = _analytics_queue.get()
+        stopping = item is None
+        batch = [] if stopping else [item]
+        deadline = time.monotonic() + ANALYTICS_FLUSH_SECONDS
+        while not stopping and len(batch) < ANALYTICS_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = _analytics_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            stopping = item is None
+            if not stopping:
+                batch.append(item)
+        if batch:
+            write_analytics_batch(batch)
+
+def write_analytics_batch(batch):
+    """Write queued (sql, params) items in order, one executemany per run of the same statement"""
+    try:
+        with get_db_connection() as conn, conn:
+            for sql, items in groupby(batch, key=lambda item: item[0]):
+                conn.executemany(sql, [params for _, params in items])
+    except Exception as e:
+        logger.warning("⚠️ Error writing %d analytics rows: %s", len(batch), e)
+
+@atexit.register
+def flush_analytics_queue():
+    """Let the writer finish everything queued (or in hand) when the process exits"""
+    if _analytics_writer_pid == os.getpid() and _analytics_writer_thread.is_alive():
+        _analytics_queue.put(None)
+        _analytics_writer_thread.join(timeout=5)
 
 def generate_auth_token(user_id, username):
     """Generate JWT token for user authentication"""
@@ -391,16 +771,34 @@ def generate_auth_token(user_id, username):
     }
     return jwt.encode(payload, jwt_secret, algorithm='HS256')
 
+# token -> (claims, expiry); only valid tokens are cached, in insertion order
+_token_cache = {}
+_token_cache_lock = threading.Lock()
+
 def verify_auth_token(token):
     """Verify JWT token and return user info"""
+    now = time.monotonic()
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    
     try:
         jwt_secret = os.getenv('JWT_SECRET_KEY', app.secret_key)
         payload = jwt.decode(token, jwt_secret, algorithms=['HS256'])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    ttl = min(TOKEN_CACHE_SECONDS, payload.get('exp', float('inf')) - time.time())
+    if ttl > 0:
+        with _token_cache_lock:
+            if len(_token_cache) >= TOKEN_CACHE_SIZE:
+                del _token_cache[next(iter(_token_cache))]
+            _token_cache.pop(token, None)
+            _token_cache[token] = (payload, now + ttl)
+    return payload
 
 def auth_required(f):
     """Decorator to protect routes that require authentication"""
@@ -408,7 +806,7 @@ def auth_required(f):
     def decorated_function(*args, **kwargs):
         token = request.headers.get('Authorization')
         if not token:
-            return jsonify({'error': 'Authentication token required'}), 401
+            return ojsonify({'error': 'Authentication token required'}, 401)
         
         # Remove "Bearer " prefix if present
         if token.startswith('Bearer '):
@@ -416,7 +814,7 @@ def auth_required(f):
         
         user_info = verify_auth_token(token)
         if not user_info:
-            return jsonify({'error': 'Invalid or expired token'}), 401
+            return ojsonify({'error': 'Invalid or expired token'}, 401)
         
         # Make user info available to the route
         request.current_user = user_info
@@ -428,43 +826,45 @@ def models_ready_required(f):
     """Decorator to check if models are loaded before processing requests"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        # Plain boolean read on the hot path; loading itself is serialized by _models_lock
         if not models_loaded:
-            return jsonify({
+            return ojsonify({
                 'error': 'Models are not loaded',
                 'status': 'error'
-            }), 503  # 503 Service Unavailable
+            }, 503)  # 503 Service Unavailable
         
         return f(*args, **kwargs)
     
     return decorated_function
 
+# Keyword extraction tables, built once instead of on every call
+_KEYWORD_RE = re.compile(r'\b[a-z]{4,}\b')
+_KEYWORD_STOPWORDS = frozenset(['the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'with', 'that', 'this'])
+
+# Genre-specific important words
+_GENRE_THEME_WORDS = {
+    'Fantasy': ['magic', 'wizard', 'dragon', 'kingdom', 'quest', 'sword', 'castle'],
+    'Mystery': ['detective', 'murder', 'clue', 'investigation', 'mystery', 'crime', 'police'],
+    'Romance': ['love', 'heart', 'passion', 'wedding', 'relationship', 'kiss', 'romantic'],
+    'Science Fiction': ['future', 'space', 'alien', 'technology', 'robot', 'galaxy', 'mars'],
+    'Horror': ['horror', 'ghost', 'dark', 'fear', 'nightmare', 'haunted', 'terror'],
+    'Adventure': ['adventure', 'journey', 'explore', 'treasure', 'hero', 'quest', 'danger']
+}
+
 # Existing utility functions (ALL PRESERVED)
 def extract_key_words(text, genre):
     """Extract key thematic words from text"""
     if not text:
         return []
     
-    words = re.findall(r'\b[a-zA-Z]{4,}\b', text.lower())
-    
-    # Genre-specific important words
-    genre_keywords = {
-        'Fantasy': ['magic', 'wizard', 'dragon', 'kingdom', 'quest', 'sword', 'castle'],
-        'Mystery': ['detective', 'murder', 'clue', 'investigation', 'mystery', 'crime', 'police'],
-        'Romance': ['love', 'heart', 'passion', 'wedding', 'relationship', 'kiss', 'romantic'],
-        'Science Fiction': ['future', 'space', 'alien', 'technology', 'robot', 'galaxy', 'mars'],
-        'Horror': ['horror', 'ghost', 'dark', 'fear', 'nightmare', 'haunted', 'terror'],
-        'Adventure': ['adventure', 'journey', 'explore', 'treasure', 'hero', 'quest', 'danger']
-    }
+    text = text.lower()
     
-    # Filter relevant words
-    relevant_words = []
-    for word in words:
-        if len(word) > 3 and word not in ['the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'with', 'that', 'this']:
-            relevant_words.append(word)
+    # Filter relevant words (the pattern already guarantees 4+ letters)
+    relevant_words = [word for word in _KEYWORD_RE.findall(text) if word not in _KEYWORD_STOPWORDS]
     
     # Add genre-specific keywords if they appear in text
-    if genre in genre_keywords:
-        relevant_words.extend([kw for kw in genre_keywords[genre] if kw in text.lower()])
+    if genre in _GENRE_THEME_WORDS:
+        relevant_words.extend([kw for kw in _GENRE_THEME_WORDS[genre] if kw in text])
     
     # Return most frequent/relevant words
     word_counts = Counter(relevant_words)
@@ -513,219 +913,206 @@ def generate_recommendation_factors(method, similarity_score=None, genre=None):
     
     return factors
 
-def get_book_image_url(book_row):
-    """Get the best available image URL for a book"""
-    # Try different image URL columns in order of preference
-    image_columns = ['image_large', 'image', 'image_small']
+# Image values that mean "no image" (case-insensitive): 'nan', 'null' or empty
+_MISSING_IMAGE_RE = re.compile(r'(?:nan|null)?', re.IGNORECASE)
+
+def resolve_image_urls(books):
+    """Get the best available image URL for every book, falling back to a title placeholder"""
+    titles = books['title'].astype(str).str[:20].str.replace(' ', '+', regex=False)
+    urls = "https://via.placeholder.com/200x300/4a5568/ffffff?text=" + titles
     
-    for col in image_columns:
-        if col in book_row and pd.notna(book_row[col]) and str(book_row[col]).lower() not in ['nan', '', 'null']:
-            return str(book_row[col])
+    # Try different image URL columns; apply the least preferred first so the best valid one wins
+    for col in reversed(['image_large', 'image', 'image_small']):
+        if col in books:
+            values = books[col].astype(str)
+            valid = books[col].notna() & ~values.str.fullmatch(_MISSING_IMAGE_RE)
+            urls = values.where(valid, urls)
     
-    # Fallback to placeholder
-    title = str(book_row.get('title', 'Book'))[:20].replace(' ', '+')
-    return f"https://via.placeholder.com/200x300/4a5568/ffffff?text={title}"
+    return urls.to_numpy()
 
 def recommend(choice, method='content', user_id=None, limit=8):
     """Enhanced recommendation algorithm with multiple methods - NO THREADING"""
-    global data, content_model, book_features, collaborative_model, user_item_matrix
-    
     if not choice or not choice.strip():
         # Return popular books when no specific choice is given
-        popular_books = data.nlargest(limit, 'popularity_score')
-        return format_book_recommendations(popular_books, 'popular', 0.8)
-    
-    choice = choice.strip()
-    print(f"🔍 Searching for: '{choice}' using method: {method}")
+        return format_book_recommendations(popularity_order[:max(limit, 0)], 'popular', 0.8)
     
     try:
-        choice_index = None
-        search_score = 0
-        
-        # Enhanced search logic with fuzzy matching
-        # Try exact match first
-        exact_match = data[data['title'].str.lower() == choice.lower()]
-        if not exact_match.empty:
-            choice_index = exact_match.index[0]
-            search_score = 1.0
-            print(f"✅ Found exact match: {exact_match.iloc[0]['title']}")
-        else:
-            # Try partial match with different strategies
-            partial_matches = data[data['title'].str.contains(choice, case=False, na=False)]
-            if not partial_matches.empty:
-                # Sort by similarity and take the best match
-                best_match = partial_matches.iloc[0]
-                choice_index = best_match.name
-                search_score = 0.8
-                print(f"✅ Found partial match: {best_match['title']}")
-            else:
-                # Try author search
-                author_matches = data[data['author'].str.contains(choice, case=False, na=False)]
-                if not author_matches.empty:
-                    choice_index = author_matches.index[0]
-                    search_score = 0.6
-                    print(f"✅ Found author match: {author_matches.iloc[0]['title']}")
-                else:
-                    # Try genre search
-                    genre_matches = data[data['genre'].str.contains(choice, case=False, na=False)]
-                    if not genre_matches.empty:
-                        choice_index = genre_matches.index[0]
-                        search_score = 0.4
-                        print(f"✅ Found genre match: {genre_matches.iloc[0]['title']}")
-        
-        # Fallback to popular books if no match found
-        if choice_index is None:
-            print(f"❌ No matches found for: '{choice}', returning popular books")
-            popular = data.nlargest(limit, 'popularity_score')
-            return format_book_recommendations(popular, 'popular', 0.7)
-        
-        # Get recommendations based on the chosen method
-        if method == 'collaborative' and collaborative_model is not None:
-            recommendations = get_collaborative_recommendations(choice_index, limit)
-        elif method == 'hybrid':
-            recommendations = get_hybrid_recommendations(choice_index, limit, user_id)
-        else:
-            # Default to content-based
-            recommendations = get_content_based_recommendations(choice_index, limit, search_score)
-            
-        return recommendations
+        # Results only depend on the query, method and limit (no method personalizes by user_id);
+        # hand out copies so callers never mutate the memoized dicts
+        cached = _recommend_cached(choice.strip().lower(), method, limit)
+        return [dict(rec) for rec in cached]
         
     except Exception as e:
-        print(f"❌ Error in recommend: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error in recommend")
         # Return popular books as fallback
-        popular = data.nlargest(limit, 'popularity_score')
-        return format_book_recommendations(popular, 'fallback', 0.5)
+        return format_book_recommendations(popularity_order[:max(limit, 0)], 'fallback', 0.5)
+
+@lru_cache(maxsize=1024)
+def _recommend_cached(choice, method, limit):
+    """Search for the chosen book and run the requested method; the helpers raise, so failures are not memoized"""
+    global data, book_features, collaborative_model, user_item_matrix
+    
+    logger.debug("🔍 Searching for: '%s' using method: %s", choice, method)
+    
+    choice_index = None
+    search_score = 0
+    
+    # Enhanced search logic with fuzzy matching
+    # Try exact match first: a dict lookup instead of lowercasing the whole title column
+    exact_index = title_index.get(choice)
+    if exact_index is not None:
+        choice_index = exact_index
+        search_score = 1.0
+        logger.debug("✅ Found exact match: %s", book_columns['title'][exact_index])
+    else:
+        # Try partial match with different strategies (choice is already lowercased)
+        # The first title containing choice is all we need, so stop at the first hit
+        partial_match = next(iter_containing(title_search, choice), None)
+        if partial_match is not None:
+            choice_index = partial_match
+            search_score = 0.8
+            logger.debug("✅ Found partial match: %s", book_columns['title'][choice_index])
+        else:
+            # Try author search
+            # Authors are in order of first appearance, so the first matching name has the earliest row
+            author_match = next(iter_containing(author_search, choice), None)
+            if author_match is not None:
+                choice_index = author_rows[author_names[author_match]][0]
+                search_score = 0.6
+                logger.debug("✅ Found author match: %s", book_columns['title'][choice_index])
+            else:
+                # Try genre search
+                genre_keys = match_genre_keys(choice)
+                if genre_keys:
+                    choice_index = min(genre_rank[key].min() for key in genre_keys)
+                    search_score = 0.4
+                    logger.debug("✅ Found genre match: %s", book_columns['title'][choice_index])
+    
+    # Fallback to popular books if no match found
+    if choice_index is None:
+        logger.debug("❌ No matches found for: '%s', returning popular books", choice)
+        return tuple(format_book_recommendations(popularity_order[:max(limit, 0)], 'popular', 0.7))
+    
+    # Get recommendations based on the chosen method, for one plain int row position
+    choice_index = int(choice_index)
+    if method == 'collaborative' and collaborative_model is not None:
+        recommendations = get_collaborative_recommendations(choice_index, limit)
+    elif method == 'hybrid':
+        recommendations = get_hybrid_recommendations(choice_index, limit)
+    else:
+        # Default to content-based
+        recommendations = get_content_based_recommendations(choice_index, limit, search_score)
+        
+    return tuple(recommendations)
 
 def get_content_based_recommendations(choice_index, limit, search_score):
     """Get content-based recommendations using ML similarity"""
-    try:
-        # Get similar books using ML model
-        distances, indices = content_model.kneighbors(
-            book_features[choice_index], 
-            n_neighbors=min(limit + 5, len(data))
-        )
-        
-        book_list = []
-        
-        for i, idx in enumerate(indices.flatten()):
-            if idx != choice_index:
-                book_data = data.iloc[idx]
-                similarity_score = 1 - distances[0][i]
-                
-                # Boost similarity score based on search quality
-                adjusted_similarity = similarity_score * search_score
-                
-                book_dict = create_book_dict(book_data, adjusted_similarity, 'content')
-                book_list.append(book_dict)
-        
-        # Sort by similarity and return top results
-        book_list.sort(key=lambda x: x['similarity'], reverse=True)
-        return book_list[:limit]
-        
-    except Exception as e:
-        print(f"❌ Error in content-based recommendations: {e}")
-        return []
+    # Cosine similarity against every book in one sparse matrix-vector product; the
+    # query row is scattered straight from the CSR arrays (no row-slice matrix built)
+    start, end = book_features.indptr[choice_index:choice_index + 2]
+    query_vector = np.zeros(book_features.shape[1], dtype=book_features.dtype)
+    query_vector[book_features.indices[start:end]] = book_features.data[start:end]
+    similarities = book_features @ query_vector
+    
+    # Only the best limit + 1 scores matter (the chosen book scores highest against itself)
+    limit = max(limit, 0)
+    n_candidates = min(limit + 1, len(similarities))
+    indices = np.argpartition(-similarities, n_candidates - 1)[:n_candidates]
+    
+    # Order just those candidates, best first, and build dicts only for the ones returned
+    indices = indices[np.argsort(-similarities[indices], kind='stable')]
+    indices = indices[indices != choice_index][:limit]
+    
+    # Boost similarity score based on search quality
+    return format_book_recommendations(indices, 'content', similarities[indices] * search_score)
 
 def get_collaborative_recommendations(choice_index, limit):
     """Get collaborative filtering recommendations"""
-    try:
-        if collaborative_model is None or user_item_matrix is None:
-            return get_content_based_recommendations(choice_index, limit, 1.0)
-        
-        # Transform the user-item matrix
-        user_factors = collaborative_model.transform(user_item_matrix)
-        
-        # Find similar users based on the book choice
-        book_vector = user_item_matrix[:, choice_index].toarray().flatten()
-        user_similarities = np.dot(user_factors, user_factors.T)
-        
-        # Get top similar users
-        similar_users = np.argsort(user_similarities[0])[::-1][:20]  # Reduced users
-        
-        # Get books liked by similar users
-        recommended_books = []
-        for user_idx in similar_users:
-            user_ratings = user_item_matrix[user_idx].toarray().flatten()
-            top_books = np.argsort(user_ratings)[::-1][:limit]
-            recommended_books.extend(top_books)
-        
-        # Remove duplicates and the original book
-        recommended_books = list(set(recommended_books))
-        if choice_index in recommended_books:
-            recommended_books.remove(choice_index)
-        
-        # Format recommendations
-        recommendations = []
-        for book_idx in recommended_books[:limit]:
-            book_data = data.iloc[book_idx]
-            book_dict = create_book_dict(book_data, 0.85, 'collaborative')
-            recommendations.append(book_dict)
-        
-        return recommendations
-        
-    except Exception as e:
-        print(f"❌ Error in collaborative recommendations: {e}")
+    if collaborative_model is None or user_item_matrix is None or user_factors is None:
         return get_content_based_recommendations(choice_index, limit, 1.0)
+    
+    # Similarity to the reference user: one matrix-vector product instead of the full Gram matrix
+    user_similarities = user_factors @ user_factors[0]
+    
+    # Get top similar users
+    similar_users = np.argsort(user_similarities)[::-1][:20]  # Reduced users
+    
+    # Get books liked by similar users: each user's best-rated books, ties by column
+    # (the order a stable sort of the dense row gives), picked from the sparse row alone
+    similar_ratings = user_item_matrix[similar_users]
+    similar_ratings.sort_indices()
+    limit = max(limit, 0)
+    top_books = []
+    for start, end in zip(similar_ratings.indptr[:-1], similar_ratings.indptr[1:]):
+        columns, ratings = similar_ratings.indices[start:end], similar_ratings.data[start:end]
+        if end - start >= limit:
+            top_books.append(columns[top_rows(ratings, limit)])
+        else:
+            # Too few rated books: rank the dense row so unrated books fill in as before
+            dense_row = np.zeros(similar_ratings.shape[1], dtype=similar_ratings.dtype)
+            dense_row[columns] = ratings
+            top_books.append(np.argsort(-dense_row, kind='stable')[:limit])
+    top_books = np.concatenate(top_books)
+    
+    # Remove duplicates (keeping first-seen order) and the original book
+    _, first_seen = np.unique(top_books, return_index=True)
+    recommended_books = top_books[np.sort(first_seen)]
+    recommended_books = recommended_books[recommended_books != choice_index]
+    
+    # Format recommendations
+    return format_book_recommendations(recommended_books[:limit], 'collaborative', 0.85)
 
 def get_hybrid_recommendations(choice_index, limit, user_id=None):
     """Get hybrid recommendations combining multiple methods"""
-    try:
-        # Get content-based recommendations
-        content_recs = get_content_based_recommendations(choice_index, limit // 2, 1.0)
-        
-        # Get collaborative recommendations if available
-        collab_recs = []
-        if collaborative_model is not None:
-            collab_recs = get_collaborative_recommendations(choice_index, limit // 2)
-        
-        # Combine and deduplicate
-        all_recs = content_recs + collab_recs
-        seen_titles = set()
-        unique_recs = []
-        
-        for rec in all_recs:
-            if rec['title'] not in seen_titles:
-                rec['method'] = 'hybrid'
-                rec['recommendationFactors'] = generate_recommendation_factors('hybrid')
-                unique_recs.append(rec)
-                seen_titles.add(rec['title'])
-        
-        return unique_recs[:limit]
-        
-    except Exception as e:
-        print(f"❌ Error in hybrid recommendations: {e}")
-        return get_content_based_recommendations(choice_index, limit, 1.0)
-
-def create_book_dict(book_data, similarity_score, method):
-    """Create standardized book dictionary for API response"""
-    keywords = extract_key_words(book_data.get('title', ''), book_data.get('genre', ''))
+    # Get content-based recommendations
+    content_recs = get_content_based_recommendations(choice_index, limit // 2, 1.0)
     
-    return {
-        'title': str(book_data['title']),
-        'author': str(book_data.get('author', 'Unknown')),
-        'rating': float(book_data.get('rating', 0)),
-        'image': get_book_image_url(book_data),
-        'similarity': float(similarity_score),
-        'genre': str(book_data.get('genre', 'General')),
-        'method': method,
-        'year': int(book_data.get('year', 2000)),
-        'publisher': str(book_data.get('publisher', 'Unknown')),
-        'popularity_score': float(book_data.get('popularity_score', 0)),
-        'reading_level': str(book_data.get('reading_level', 'Intermediate')),
-        'recommendationReason': get_recommendation_reason(method, book_data.get('genre', '')),
-        'keywords': keywords[:5],
-        'recommendationFactors': generate_recommendation_factors(method, similarity_score)
-    }
+    # Get collaborative recommendations if available
+    collab_recs = []
+    if collaborative_model is not None:
+        collab_recs = get_collaborative_recommendations(choice_index, limit // 2)
+    
+    # Combine and deduplicate
+    all_recs = content_recs + collab_recs
+    seen_titles = set()
+    unique_recs = []
+    
+    for rec in all_recs:
+        if rec['title'] not in seen_titles:
+            rec['method'] = 'hybrid'
+            rec['recommendationFactors'] = generate_recommendation_factors('hybrid')
+            unique_recs.append(rec)
+            seen_titles.add(rec['title'])
+    
+    return unique_recs[:limit]
 
-def format_book_recommendations(books_df, method, base_similarity):
-    """Format a DataFrame of books into recommendation format"""
-    recommendations = []
+def format_book_recommendations(book_indices, method, similarity):
+    """Format row positions of books into recommendation format (one shared similarity or one per book)"""
+    book_indices = np.asarray(book_indices, dtype=np.intp)
+    similarities = np.broadcast_to(similarity, book_indices.shape)
     
-    for _, book in books_df.iterrows():
-        book_dict = create_book_dict(book, base_similarity, method)
-        recommendations.append(book_dict)
+    # One fancy-index per column; tolist() converts the NumPy scalars to Python values in C
+    columns = [book_columns[name][book_indices].tolist() for name in
+               ('title', 'author', 'rating', 'image', 'genre', 'year', 'publisher', 'popularity_score', 'reading_level')]
+    
+    recommendations = []
+    for (title, author, rating, image, genre, year, publisher, popularity_score, reading_level), similarity_score in zip(zip(*columns), similarities):
+        recommendations.append({
+            'title': title,
+            'author': author,
+            'rating': rating,
+            'image': image,
+            'similarity': float(similarity_score),
+            'genre': genre,
+            'method': method,
+            'year': year,
+            'publisher': publisher,
+            'popularity_score': popularity_score,
+            'reading_level': reading_level,
+            'recommendationReason': get_recommendation_reason(method, genre),
+            'keywords': extract_key_words(title, genre)[:5],
+            'recommendationFactors': generate_recommendation_factors(method, similarity_score)
+        })
     
     return recommendations
 
@@ -742,181 +1129,237 @@ def get_recommendation_reason(method, genre):
     }
     return reasons.get(method, "Recommended for you")
 
+def match_genre_keys(text):
+    """Genre labels containing text, case-insensitively (a literal match, not a regex)"""
+    text = text.lower()
+    return [key for key, key_lower in genre_labels_lower if text in key_lower]
+
+def match_author_keys(text):
+    """Author names containing text, case-insensitively (a literal match, not a regex)"""
+    return [author_names[i] for i in iter_containing(author_search, text.lower())]
+
 def get_genre_based_recommendations(genre, n_recommendations=10):
     """Get recommendations based on genre with enhanced features"""
-    try:
-        decoded_genre = unquote(genre)
-        print(f"🎭 Getting recommendations for genre: '{decoded_genre}'")
-        
-        # Filter books by genre with fallback logic
-        genre_books = data[data['genre'].str.contains(decoded_genre, case=False, na=False)]
-        
-        if genre_books.empty:
-            # Try splitting genre and matching parts
-            genre_parts = decoded_genre.split('/')
-            for part in genre_parts:
-                if part.strip():
-                    genre_books = data[data['genre'].str.contains(part.strip(), case=False, na=False)]
-                    if not genre_books.empty:
-                        break
-        
-        if genre_books.empty:
-            return []
-        
-        # Sort by popularity score and rating
-        top_books = genre_books.nlargest(n_recommendations, ['popularity_score', 'rating'])
-        
-        recommendations = []
-        for _, book in top_books.iterrows():
-            book_dict = create_book_dict(book, 0.85, 'genre')
-            book_dict['recommendationReason'] = f"Top-rated book in {decoded_genre}"
-            recommendations.append(book_dict)
-        
-        return recommendations
+    decoded_genre = unquote(genre)
+    logger.debug("🎭 Getting recommendations for genre: '%s'", decoded_genre)
     
-    except Exception as e:
-        print(f"❌ Genre-based recommendation error: {e}")
+    # Match against the handful of genre labels instead of scanning every row
+    genre_keys = match_genre_keys(decoded_genre)
+    
+    if not genre_keys:
+        # Try splitting genre and matching parts
+        genre_parts = decoded_genre.split('/')
+        for part in genre_parts:
+            if part.strip():
+                genre_keys = match_genre_keys(part.strip())
+                if genre_keys:
+                    break
+    
+    if not genre_keys:
         return []
+    
+    # Each genre's head is pre-formatted in popularity score and rating order, so merge the heads
+    n_recommendations = max(min(n_recommendations, GENRE_TOP_N), 0)
+    candidates = [(popularity_rank[row], book_dict) for key in genre_keys
+                  for row, book_dict in zip(genre_rank[key][:n_recommendations], genre_top_books[key][:n_recommendations])]
+    candidates.sort(key=lambda candidate: candidate[0])
+    
+    reason = f"Top-rated book in {decoded_genre}"
+    return [dict(book_dict, recommendationReason=reason) for _, book_dict in candidates[:n_recommendations]]
 
 def get_author_based_recommendations(author, n_recommendations=10):
     """Get recommendations based on author with enhanced features"""
     try:
         decoded_author = unquote(author)
-        print(f"✍️ Getting books by author: {decoded_author}")
+        logger.debug("✍️ Getting books by author: %s", decoded_author)
         
         # Find books by the author with fuzzy matching
-        author_books = data[data['author'].str.contains(decoded_author, case=False, na=False)]
+        author_keys = match_author_keys(decoded_author)
         
-        if author_books.empty:
+        if not author_keys:
             return []
         
         # Sort by rating and popularity
-        top_books = author_books.nlargest(n_recommendations, ['rating', 'popularity_score'])
+        top_books = np.concatenate([author_rows[key] for key in author_keys])
+        top_books = top_books[np.argsort(author_rank[top_books])][:max(n_recommendations, 0)]
         
-        recommendations = []
-        for _, book in top_books.iterrows():
-            book_dict = create_book_dict(book, 0.90, 'author')
-            book_dict['recommendationReason'] = f"By {book['author']}"
-            recommendations.append(book_dict)
+        recommendations = format_book_recommendations(top_books, 'author', 0.90)
+        for book_dict in recommendations:
+            book_dict['recommendationReason'] = f"By {book_dict['author']}"
         
         return recommendations
     
     except Exception as e:
-        print(f"❌ Author-based recommendation error: {e}")
+        logger.exception("❌ Author-based recommendation error")
         return []
 
+# One pooled session keeps TLS connections to Google Books alive between lookups;
+# transient failures (429/5xx, dropped connections) get two quick retries
+google_books_session = requests.Session()
+google_books_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']), raise_on_status=False)
+))
+
+# normalized title -> (details, expiry); only found books are kept, and each entry
+# expires with its book_details_cache row so BOOK_DETAILS_CACHE_DAYS holds here too
+_google_details_cache = {}
+_google_details_cache_lock = threading.Lock()
+
 def fetch_book_details_from_google(book_title):
-    """Fetch detailed book information from Google Books API"""
+    """Fetch detailed book information from Google Books API, cached per normalized title"""
+    title_key = book_title.strip().lower()
+    now = datetime.now()
+    with _google_details_cache_lock:
+        cached = _google_details_cache.get(title_key)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    
     try:
-        print(f"📖 Fetching Google Books details for: {book_title}")
-        
-        # Clean the book title for better search results
-        clean_title = book_title.replace(' (', '').replace(')', '').strip()
-        
-        # Google Books API endpoint
-        api_url = "https://www.googleapis.com/books/v1/volumes"
-        params = {
-            'q': f'intitle:"{clean_title}"',
-            'maxResults': 5,
-            'printType': 'books'
-        }
-        
-        # Add API key if available
-        google_api_key = os.getenv('GOOGLE_BOOKS_API_KEY')
-        if google_api_key:
-            params['key'] = google_api_key
-        
-        response = requests.get(api_url, params=params, timeout=10)
+        book_details, fetched_at = _fetch_google_details(title_key)
+    except Exception as e:
+        logger.exception("❌ Error fetching from Google Books for %s", book_title)
+        return None
+    
+    if book_details:
+        with _google_details_cache_lock:
+            if len(_google_details_cache) >= GOOGLE_DETAILS_CACHE_SIZE:
+                del _google_details_cache[next(iter(_google_details_cache))]
+            _google_details_cache.pop(title_key, None)
+            _google_details_cache[title_key] = (book_details, fetched_at + timedelta(days=BOOK_DETAILS_CACHE_DAYS))
+    return book_details
+
+def _fetch_google_details(title_key):
+    """Serve Google Books details from SQLite or the network, with the time they were fetched"""
+    cutoff = (datetime.now() - timedelta(days=BOOK_DETAILS_CACHE_DAYS)).isoformat()
+    with get_db_connection() as conn:
+        row = conn.execute(
+            'SELECT payload, fetched_at FROM book_details_cache WHERE title = ? AND fetched_at >= ?',
+            (title_key, cutoff)
+        ).fetchone()
+    if row:
+        return orjson.loads(row[0]), datetime.fromisoformat(row[1])
+    
+    book_details = _request_google_details(title_key)
+    fetched_at = get_current_timestamp()
+    if book_details:
+        with get_db_connection() as conn, conn:
+            conn.execute(
+                '''INSERT INTO book_details_cache (title, payload, fetched_at) VALUES (?, ?, ?)
+                   ON CONFLICT (title) DO UPDATE SET payload = excluded.payload, fetched_at = excluded.fetched_at''',
+                (title_key, orjson.dumps(book_details).decode(), fetched_at)
+            )
+    return book_details, datetime.fromisoformat(fetched_at)
+
+def _request_google_details(book_title):
+    """Query the Google Books API for a title"""
+    logger.debug("📖 Fetching Google Books details for: %s", book_title)
+    
+    # Clean the book title for better search results
+    clean_title = book_title.replace(' (', '').replace(')', '').strip()
+    
+    # Google Books API endpoint
+    api_url = "https://www.googleapis.com/books/v1/volumes"
+    params = {
+        'q': f'intitle:"{clean_title}"',
+        'maxResults': 5,
+        'printType': 'books'
+    }
+    
+    # Add API key if available
+    google_api_key = os.getenv('GOOGLE_BOOKS_API_KEY')
+    if google_api_key:
+        params['key'] = google_api_key
+    
+    response = google_books_session.get(api_url, params=params, timeout=10)
+    
+    if response.status_code == 200:
+        api_data = response.json()
         
-        if response.status_code == 200:
-            api_data = response.json()
+        if 'items' in api_data and len(api_data['items']) > 0:
+            # Find the best match
+            best_match = None
+            best_score = 0
             
-            if 'items' in api_data and len(api_data['items']) > 0:
-                # Find the best match
-                best_match = None
-                best_score = 0
+            for item in api_data['items']:
+                volume_info = item.get('volumeInfo', {})
+                title = volume_info.get('title', '').lower()
+                clean_search_title = clean_title.lower()
                 
-                for item in api_data['items']:
-                    volume_info = item.get('volumeInfo', {})
-                    title = volume_info.get('title', '').lower()
-                    clean_search_title = clean_title.lower()
-                    
-                    # Simple similarity check
-                    if clean_search_title in title or title in clean_search_title:
-                        score = len(set(clean_search_title.split()) & set(title.split()))
-                        if score > best_score:
-                            best_score = score
-                            best_match = volume_info
-                
-                # Use first result if no good match found
-                if not best_match:
-                    best_match = api_data['items'][0].get('volumeInfo', {})
-                
-                # Extract book details
-                book_details = {
-                    'title': best_match.get('title', 'Unknown Title'),
-                    'authors': best_match.get('authors', ['Unknown Author']),
-                    'description': best_match.get('description', 'No description available'),
-                    'averageRating': best_match.get('averageRating'),
-                    'ratingsCount': best_match.get('ratingsCount'),
-                    'pageCount': best_match.get('pageCount'),
-                    'publishedDate': best_match.get('publishedDate'),
-                    'publisher': best_match.get('publisher'),
-                    'categories': best_match.get('categories', []),
-                    'language': best_match.get('language'),
-                    'previewLink': best_match.get('previewLink'),
-                    'infoLink': best_match.get('infoLink'),
-                    'source': 'Google Books API'
-                }
-                
-                # Handle image links
-                image_links = best_match.get('imageLinks', {})
-                if image_links:
-                    # Use the largest available image
-                    for size in ['large', 'medium', 'small', 'thumbnail', 'smallThumbnail']:
-                        if size in image_links:
-                            book_details['imageLinks'] = {'thumbnail': image_links[size]}
-                            break
-                
-                # Industry identifiers (ISBN, etc.)
-                industry_identifiers = best_match.get('industryIdentifiers', [])
-                for identifier in industry_identifiers:
-                    if identifier.get('type') == 'ISBN_13':
-                        book_details['isbn'] = identifier.get('identifier')
+                # Simple similarity check
+                if clean_search_title in title or title in clean_search_title:
+                    score = len(set(clean_search_title.split()) & set(title.split()))
+                    if score > best_score:
+                        best_score = score
+                        best_match = volume_info
+            
+            # Use first result if no good match found
+            if not best_match:
+                best_match = api_data['items'][0].get('volumeInfo', {})
+            
+            # Extract book details
+            book_details = {
+                'title': best_match.get('title', 'Unknown Title'),
+                'authors': best_match.get('authors', ['Unknown Author']),
+                'description': best_match.get('description', 'No description available'),
+                'averageRating': best_match.get('averageRating'),
+                'ratingsCount': best_match.get('ratingsCount'),
+                'pageCount': best_match.get('pageCount'),
+                'publishedDate': best_match.get('publishedDate'),
+                'publisher': best_match.get('publisher'),
+                'categories': best_match.get('categories', []),
+                'language': best_match.get('language'),
+                'previewLink': best_match.get('previewLink'),
+                'infoLink': best_match.get('infoLink'),
+                'source': 'Google Books API'
+            }
+            
+            # Handle image links
+            image_links = best_match.get('imageLinks', {})
+            if image_links:
+                # Use the largest available image
+                for size in ['large', 'medium', 'small', 'thumbnail', 'smallThumbnail']:
+                    if size in image_links:
+                        book_details['imageLinks'] = {'thumbnail': image_links[size]}
                         break
-                
-                print(f"✅ Found Google Books details for: {book_details['title']}")
-                return book_details
-            else:
-                print(f"❌ No books found in Google Books for: {book_title}")
-                return None
+            
+            # Industry identifiers (ISBN, etc.)
+            industry_identifiers = best_match.get('industryIdentifiers', [])
+            for identifier in industry_identifiers:
+                if identifier.get('type') == 'ISBN_13':
+                    book_details['isbn'] = identifier.get('identifier')
+                    break
+            
+            logger.debug("✅ Found Google Books details for: %s", book_details['title'])
+            return book_details
         else:
-            print(f"❌ Google Books API request failed with status: {response.status_code}")
+            logger.debug("❌ No books found in Google Books for: %s", book_title)
             return None
-            
-    except Exception as e:
-        print(f"❌ Error fetching from Google Books for {book_title}: {e}")
+    else:
+        logger.warning("❌ Google Books API request failed with status: %s", response.status_code)
         return None
 
 def fetch_book_details_combined(book_title):
     """Try to fetch book details from multiple sources"""
-    print(f"🔍 Fetching book details for: {book_title}")
+    logger.debug("🔍 Fetching book details for: %s", book_title)
     
     # Try our local database first
-    local_book = data[data['title'].str.lower() == book_title.lower()]
-    if not local_book.empty:
-        book = local_book.iloc[0]
+    idx = title_index.get(book_title.lower())
+    if idx is not None:
+        book = {col: values[idx] for col, values in book_columns.items()}
         local_details = {
-            'title': str(book['title']),
-            'authors': [str(book['author'])],
+            'title': book['title'],
+            'authors': [book['author']],
             'description': f"A {book['genre']} book by {book['author']}. Published by {book['publisher']} in {book['year']}.",
             'averageRating': float(book['rating']),
-            'ratingsCount': int(book.get('user_ratings', 100)),
+            'ratingsCount': int(book['user_ratings']),
             'publishedDate': str(book['year']),
-            'publisher': str(book['publisher']),
-            'categories': [str(book['genre'])],
-            'readingLevel': str(book.get('reading_level', 'Intermediate')),
-            'popularityScore': float(book.get('popularity_score', 0)),
+            'publisher': book['publisher'],
+            'categories': [book['genre']],
+            'readingLevel': book['reading_level'],
+            'popularityScore': float(book['popularity_score']),
             'source': 'BookQuest Database'
         }
         
@@ -954,7 +1397,7 @@ def fetch_book_details_combined(book_title):
 def signup():
     """Enhanced user registration endpoint"""
     if request.method == 'OPTIONS':
-        return jsonify({'status': 'ok'}), 200
+        return ojsonify({'status': 'ok'})
     
     try:
         data_req = request.get_json()
@@ -964,41 +1407,34 @@ def signup():
         
         # Enhanced validation
         if not username or len(username) < 3:
-            return jsonify({'error': 'Username must be at least 3 characters long'}), 400
+            return ojsonify({'error': 'Username must be at least 3 characters long'}, 400)
         
         if not re.match(r'^[a-zA-Z0-9_]+$', username):
-            return jsonify({'error': 'Username can only contain letters, numbers, and underscores'}), 400
+            return ojsonify({'error': 'Username can only contain letters, numbers, and underscores'}, 400)
         
         if not email or '@' not in email or '.' not in email.split('@')[1]:
-            return jsonify({'error': 'Valid email is required'}), 400
+            return ojsonify({'error': 'Valid email is required'}, 400)
         
         if not password or len(password) < 6:
-            return jsonify({'error': 'Password must be at least 6 characters long'}), 400
+            return ojsonify({'error': 'Password must be at least 6 characters long'}, 400)
         
         with get_db_connection() as conn:
-            # Check if user already exists
-            existing_user = conn.execute(
-                'SELECT id FROM users WHERE username = ? OR email = ?',
-                (username, email)
-            ).fetchone()
-            
-            if existing_user:
-                return jsonify({'error': 'Username or email already exists'}), 409
-            
-            # Create new user
-            password_hash = generate_password_hash(password)
-            cursor = conn.execute(
-                'INSERT INTO users (username, email, password_hash, created_at) VALUES (?, ?, ?, ?)',
-                (username, email, password_hash, get_current_timestamp())
-            )
-            user_id = cursor.lastrowid
+            # Create new user; the UNIQUE username/email constraints reject duplicates
+            password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+            try:
+                user_id = conn.execute(
+                    'INSERT INTO users (username, email, password_hash, created_at) VALUES (?, ?, ?, ?) RETURNING id',
+                    (username, email, password_hash, get_current_timestamp())
+                ).fetchone()[0]
+            except sqlite3.IntegrityError:
+                return ojsonify({'error': 'Username or email already exists'}, 409)
             conn.commit()
             
             # Generate token
             token = generate_auth_token(user_id, username)
             
-            print(f"✅ New user registered: {username}")
-            return jsonify({
+            logger.info("✅ New user registered: %s", username)
+            return ojsonify({
                 'message': 'Account created successfully',
                 'token': token,
                 'user': {
@@ -1006,18 +1442,18 @@ def signup():
                     'username': username,
                     'email': email
                 }
-            }), 201
+            }, 201)
             
     except Exception as e:
-        print(f"❌ Signup error: {e}")
-        return jsonify({'error': 'Failed to create account'}), 500
+        logger.exception("❌ Signup error")
+        return ojsonify({'error': 'Failed to create account'}, 500)
 
 @app.route('/api/auth/login', methods=['POST', 'OPTIONS'])
 @cross_origin()
 def login():
     """Enhanced user login endpoint"""
     if request.method == 'OPTIONS':
-        return jsonify({'status': 'ok'}), 200
+        return ojsonify({'status': 'ok'})
     
     try:
         data_req = request.get_json()
@@ -1025,7 +1461,7 @@ def login():
         password = data_req.get('password', '').strip()
         
         if not username_or_email or not password:
-            return jsonify({'error': 'Username/email and password are required'}), 400
+            return ojsonify({'error': 'Username/email and password are required'}, 400)
         
         with get_db_connection() as conn:
             # Find user by username or email
@@ -1034,8 +1470,8 @@ def login():
                 (username_or_email, username_or_email)
             ).fetchone()
             
-            if not user or not check_password_hash(user[3], password):
-                return jsonify({'error': 'Invalid credentials'}), 401
+            if not user or not verify_password(user[3], password):
+                return ojsonify({'error': 'Invalid credentials'}, 401)
             
             # Generate token
             token = generate_auth_token(user[0], user[1])
@@ -1047,8 +1483,8 @@ def login():
             )
             conn.commit()
             
-            print(f"✅ User logged in: {user[1]}")
-            return jsonify({
+            logger.info("✅ User logged in: %s", user[1])
+            return ojsonify({
                 'message': 'Login successful',
                 'token': token,
                 'user': {
@@ -1056,33 +1492,44 @@ def login():
                     'username': user[1],
                     'email': user[2]
                 }
-            }), 200
+            })
             
     except Exception as e:
-        print(f"❌ Login error: {e}")
-        return jsonify({'error': 'Login failed'}), 500
+        logger.exception("❌ Login error")
+        return ojsonify({'error': 'Login failed'}, 500)
 
 @app.route('/api/auth/verify', methods=['GET', 'OPTIONS'])
 @cross_origin()
 @auth_required
 def verify_token():
     """Verify if user token is valid"""
-    return jsonify({
-        'valid': True,
-        'user': {
-            'id': request.current_user['user_id'],
-            'username': request.current_user['username']
-        }
-    }), 200
+    user_id = request.current_user['user_id']
+    username = request.current_user['username']
+    
+    # The body only depends on the token's user, so polling clients revalidate with a bare 304
+    etag = f"{user_id}-{username}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = ojsonify({
+            'valid': True,
+            'user': {
+                'id': user_id,
+                'username': username
+            }
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @app.route('/api/auth/logout', methods=['POST', 'OPTIONS'])
 @cross_origin()
 def logout():
     """User logout endpoint"""
     if request.method == 'OPTIONS':
-        return jsonify({'status': 'ok'}), 200
+        return ojsonify({'status': 'ok'})
     
-    return jsonify({'message': 'Logged out successfully'}), 200
+    return ojsonify({'message': 'Logged out successfully'})
 
 # --- API ROUTES ---
 
@@ -1091,14 +1538,14 @@ def logout():
 def health():
     """Enhanced health check endpoint"""
     try:
-        return jsonify({
+        return ojsonify({
             'status': 'healthy' if models_loaded else 'error',
             'model_loaded': models_loaded,
             'data_loading': False,  # No more loading states with sync loading
             'timestamp': get_current_timestamp(),
             'data_size': len(data) if data is not None else 0,
             'features': {
-                'content_based': content_model is not None,
+                'content_based': book_features is not None,
                 'collaborative_filtering': collaborative_model is not None,
                 'google_books_api': bool(os.getenv('GOOGLE_BOOKS_API_KEY')),
                 'user_authentication': True,
@@ -1106,11 +1553,11 @@ def health():
             }
         })
     except Exception as e:
-        return jsonify({
+        return ojsonify({
             'status': 'error',
             'error': str(e),
             'timestamp': get_current_timestamp()
-        }), 500
+        }, 500)
 
 @app.route('/api/recommend')
 @cross_origin()
@@ -1119,17 +1566,17 @@ def api_recommend():
     """Enhanced book recommendations with multiple methods - SYNCHRONOUS"""
     query = request.args.get('q', '')
     method = request.args.get('method', 'content')  # content, collaborative, hybrid
-    limit = min(int(request.args.get('limit', 8)), 20)  # Max 20 recommendations
+    limit = max(min(int(request.args.get('limit', 8)), 20), 0)  # Max 20 recommendations
     
-    print(f"🔍 Recommendation request: '{query}' (method: {method}, limit: {limit})")
+    logger.debug("🔍 Recommendation request: '%s' (method: %s, limit: %s)", query, method, limit)
     
     if not query:
-        return jsonify({
+        return ojsonify({
             'error': 'No query provided',
             'query': '',
             'recommendations': [],
             'count': 0
-        }), 400
+        }, 400)
     
     try:
         # Get user ID if authenticated
@@ -1142,118 +1589,115 @@ def api_recommend():
         
         recommendations = recommend(query, method, user_id, limit)
         
-        print(f"✅ Found {len(recommendations)} recommendations")
+        logger.debug("✅ Found %s recommendations", len(recommendations))
         
         # Log search analytics
-        try:
-            with get_db_connection() as conn:
-                conn.execute(
-                    'INSERT INTO searches (query, timestamp, results_count) VALUES (?, ?, ?)',
-                    (query, get_current_timestamp(), len(recommendations))
-                )
-                conn.commit()
-        except Exception as e:
-            print(f"⚠️ Error logging search: {e}")
+        queue_analytics_write(
+            'INSERT INTO searches (query, timestamp, results_count) VALUES (?, ?, ?)',
+            (query, get_current_timestamp(), len(recommendations))
+        )
         
-        return jsonify({
+        response = ojsonify({
             'query': query,
             'method': method,
             'recommendations': recommendations,
             'count': len(recommendations)
         })
+        # Results depend only on the query string and change at most on a model reload,
+        # so browsers and shared proxies may reuse them for a few minutes
+        response.headers['Cache-Control'] = 'public, max-age=300'
+        return response
         
     except Exception as e:
-        print(f"❌ Error in api_recommend: {e}")
-        return jsonify({
+        logger.exception("❌ Error in api_recommend")
+        return ojsonify({
             'error': str(e),
             'query': query,
             'recommendations': [],
             'count': 0
-        }), 500
+        }, 500)
 
 @app.route('/api/book/<path:book_title>')
 @cross_origin()
 @models_ready_required
 def get_book_details(book_title):
     """Get detailed book information from multiple sources"""
-    print(f"📖 Getting details for: {book_title}")
+    logger.debug("📖 Getting details for: %s", book_title)
     
     try:
         book_details = fetch_book_details_combined(book_title)
         
         # Log book view analytics
-        try:
-            with get_db_connection() as conn:
-                conn.execute(
-                    '''INSERT OR REPLACE INTO book_analytics 
-                       (book_title, view_count, last_accessed) 
-                       VALUES (?, COALESCE((SELECT view_count FROM book_analytics WHERE book_title = ?) + 1, 1), ?)''',
-                    (book_title, book_title, get_current_timestamp())
-                )
-                conn.commit()
-        except Exception as e:
-            print(f"⚠️ Error logging book analytics: {e}")
+        queue_analytics_write(
+            '''INSERT OR REPLACE INTO book_analytics 
+               (book_title, view_count, last_accessed) 
+               VALUES (?, COALESCE((SELECT view_count FROM book_analytics WHERE book_title = ?) + 1, 1), ?)''',
+            (book_title, book_title, get_current_timestamp())
+        )
         
-        return jsonify(book_details)
+        return ojsonify(book_details)
         
     except Exception as e:
-        print(f"❌ Error getting book details: {e}")
-        return jsonify({
+        logger.exception("❌ Error getting book details")
+        return ojsonify({
             'error': f'Failed to fetch book details: {str(e)}',
             'title': book_title
-        }), 500
+        }, 500)
+
+@lru_cache(maxsize=512)
+def genre_response_body(genre, limit):
+    """Serialized /api/recommend/genre body for a raw genre path and limit (cleared on reload)"""
+    recommendations = get_genre_based_recommendations(genre, limit)
+    return orjson.dumps({
+        'genre': unquote(genre),
+        'recommendations': recommendations,
+        'count': len(recommendations)
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
 
 @app.route('/api/recommend/genre/<path:genre>')  
 @cross_origin()
 @models_ready_required
 def genre_recommend(genre):
     """Get recommendations by genre"""
-    limit = min(int(request.args.get('limit', 12)), 20)
-    print(f"🎭 Genre recommendation request for: {genre} (limit: {limit})")
+    limit = max(min(int(request.args.get('limit', 12)), 20), 0)
+    logger.debug("🎭 Genre recommendation request for: %s (limit: %s)", genre, limit)
     
     try:
-        recommendations = get_genre_based_recommendations(genre, limit)
-        decoded_genre = unquote(genre)
-        
-        return jsonify({
-            'genre': decoded_genre,
-            'recommendations': recommendations,
-            'count': len(recommendations)
-        })
+        return app.response_class(genre_response_body(genre, limit), mimetype='application/json')
     except Exception as e:
-        print(f"❌ Error in genre_recommend: {e}")
-        return jsonify({
+        logger.exception("❌ Error in genre_recommend")
+        return ojsonify({
             'genre': unquote(genre),
             'recommendations': [], 
             'count': 0,
             'error': str(e)
-        }), 500
+        }, 500)
 
 @app.route('/api/recommend/author/<path:author>') 
 @cross_origin()
 @models_ready_required
 def author_recommend(author):
     """Get recommendations by author"""
-    limit = min(int(request.args.get('limit', 12)), 20)
-    print(f"✍️ Author recommendation request for: {author} (limit: {limit})")
+    limit = max(min(int(request.args.get('limit', 12)), 20), 0)
+    logger.debug("✍️ Author recommendation request for: %s (limit: %s)", author, limit)
     
     try:
         recommendations = get_author_based_recommendations(author, limit)
         decoded_author = unquote(author)
         
-        return jsonify({
+        return ojsonify({
             'author': decoded_author,
             'recommendations': recommendations,
             'count': len(recommendations)
         })
     except Exception as e:
-        print(f"❌ Error in author_recommend: {e}")
-        return jsonify({
+        logger.exception("❌ Error in author_recommend")
+        return ojsonify({
             'author': unquote(author),
             'recommendations': [], 
             'count': 0,
             'error': str(e)
-        }), 500
+        }, 500)
 
 @app.route('/api/recommend/hybrid', methods=['POST', 'OPTIONS'])
 @cross_origin()
@@ -1261,13 +1705,13 @@ def author_recommend(author):
 def hybrid_recommend():
     """API endpoint for hybrid recommendations"""
     if request.method == 'OPTIONS':
-        return jsonify({'status': 'ok'}), 200
+        return ojsonify({'status': 'ok'})
     
     try:
         request_data = request.get_json() if request.is_json else {}
         book_title = request_data.get('book_title', '')
         user_preferences = request_data.get('preferences', {})
-        limit = min(int(request_data.get('limit', 8)), 20)
+        limit = max(min(int(request_data.get('limit', 8)), 20), 0)
         
         # Get user ID if authenticated
         user_id = None
@@ -1280,21 +1724,43 @@ def hybrid_recommend():
         if book_title:
             recommendations = recommend(book_title, 'hybrid', user_id, limit)
             
-            return jsonify({
+            return ojsonify({
                 'recommendations': recommendations,
                 'count': len(recommendations),
                 'method': 'hybrid'
             })
         else:
-            return jsonify({
+            return ojsonify({
                 'recommendations': [],
                 'count': 0,
                 'error': 'No search parameters provided'
             })
     
     except Exception as e:
-        print(f"❌ Error in hybrid_recommend: {e}")
-        return jsonify({'error': str(e), 'recommendations': [], 'count': 0}), 500
+        logger.exception("❌ Error in hybrid_recommend")
+        return ojsonify({'error': str(e), 'recommendations': [], 'count': 0}, 500)
+
+def build_genres_payload():
+    """Genres with their book counts, most common first"""
+    # Get genres with their counts
+    genre_counts = data['genre'].value_counts()
+    genres = []
+    
+    for genre, count in genre_counts.items():
+        if str(genre).strip() and count > 5:  # Only include genres with at least 5 books
+            genres.append({
+                'name': str(genre).strip(),
+                'count': int(count),
+                'popularity': min(100, int(count / 10))  # Normalized popularity score
+            })
+    
+    # Sort by popularity
+    genres.sort(key=lambda x: x['count'], reverse=True)
+    
+    return {
+        'genres': genres,
+        'total_genres': len(genres)
+    }
 
 @app.route('/api/genres')
 @cross_origin()
@@ -1303,25 +1769,7 @@ def get_genres():
     """Get all available genres"""
     try:
         if data is not None and 'genre' in data.columns:
-            # Get genres with their counts
-            genre_counts = data['genre'].value_counts()
-            genres = []
-            
-            for genre, count in genre_counts.items():
-                if str(genre).strip() and count > 5:  # Only include genres with at least 5 books
-                    genres.append({
-                        'name': str(genre).strip(),
-                        'count': int(count),
-                        'popularity': min(100, int(count / 10))  # Normalized popularity score
-                    })
-            
-            # Sort by popularity
-            genres.sort(key=lambda x: x['count'], reverse=True)
-            
-            return jsonify({
-                'genres': genres,
-                'total_genres': len(genres)
-            })
+            return cached_json_response('genres', build_genres_payload)
         
         # Fallback genres with estimated counts
         fallback_genres = [
@@ -1335,14 +1783,41 @@ def get_genres():
             {'name': 'Children/Young Adult', 'count': 110, 'popularity': 88},
             {'name': 'General Fiction', 'count': 200, 'popularity': 95}
         ]
-        return jsonify({
+        return ojsonify({
             'genres': fallback_genres,
             'total_genres': len(fallback_genres)
         })
         
     except Exception as e:
-        print(f"❌ Error getting genres: {e}")
-        return jsonify({'genres': [], 'total_genres': 0}), 500
+        logger.exception("❌ Error getting genres")
+        return ojsonify({'genres': [], 'total_genres': 0}, 500)
+
+def build_authors_payload():
+    """Top authors by book count with their average rating and main genres"""
+    # Get top authors by book count
+    author_counts = data['author'].value_counts()
+    authors = []
+    
+    for author, count in author_counts.head(50).items():  # Top 50 authors
+        if str(author).strip() and str(author) != 'Unknown' and count > 2:
+            # Get average rating for this author from their rows in the column arrays
+            author_books = author_rows[author]
+            avg_rating = book_columns['rating'][author_books].mean()
+            
+            authors.append({
+                'name': str(author).strip(),
+                'book_count': int(count),
+                'average_rating': round(float(avg_rating), 1),
+                'genres': pd.unique(book_columns['genre'][author_books])[:3].tolist()  # Top 3 genres
+            })
+    
+    # Sort by book count
+    authors.sort(key=lambda x: x['book_count'], reverse=True)
+    
+    return {
+        'authors': authors,
+        'total_authors': len(authors)
+    }
 
 @app.route('/api/authors')
 @cross_origin()
@@ -1351,36 +1826,41 @@ def get_authors():
     """Get popular authors with their book counts"""
     try:
         if data is not None and 'author' in data.columns:
-            # Get top authors by book count
-            author_counts = data['author'].value_counts()
-            authors = []
-            
-            for author, count in author_counts.head(50).items():  # Top 50 authors
-                if str(author).strip() and str(author) != 'Unknown' and count > 2:
-                    # Get average rating for this author
-                    author_books = data[data['author'] == author]
-                    avg_rating = author_books['rating'].mean()
-                    
-                    authors.append({
-                        'name': str(author).strip(),
-                        'book_count': int(count),
-                        'average_rating': round(float(avg_rating), 1),
-                        'genres': list(author_books['genre'].unique()[:3])  # Top 3 genres
-                    })
-            
-            # Sort by book count
-            authors.sort(key=lambda x: x['book_count'], reverse=True)
-            
-            return jsonify({
-                'authors': authors,
-                'total_authors': len(authors)
-            })
+            return cached_json_response('authors', build_authors_payload)
         
-        return jsonify({'authors': [], 'total_authors': 0})
+        return ojsonify({'authors': [], 'total_authors': 0})
         
     except Exception as e:
-        print(f"❌ Error getting authors: {e}")
-        return jsonify({'authors': [], 'total_authors': 0}), 500
+        logger.exception("❌ Error getting authors")
+        return ojsonify({'authors': [], 'total_authors': 0}, 500)
+
+def top_rows(values, k):
+    """Row positions of the k largest values, ties in row order (same as nlargest(keep='first'))"""
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    # Partition only to find the k-th largest value, then rank the few rows at or above it
+    threshold = values[np.argpartition(values, len(values) - k)[len(values) - k]]
+    candidates = np.flatnonzero(values >= threshold)
+    return candidates[np.argsort(-values[candidates], kind='stable')[:k]]
+
+def build_popular_payload(sort_by, limit):
+    """Top books for one of the popular-list sort orders"""
+    if sort_by == 'rating':
+        popular_books = top_rows(book_columns['rating'], limit)
+    elif sort_by == 'recent':
+        popular_books = top_rows(book_columns['year'], limit)
+    else:
+        popular_books = popularity_order[:limit]
+    
+    books = format_book_recommendations(popular_books, 'popular', 0.8)
+    
+    return {
+        'books': books,
+        'count': len(books),
+        'sort_by': sort_by
+    }
 
 @app.route('/api/popular')
 @cross_origin()
@@ -1388,27 +1868,17 @@ def get_authors():
 def get_popular_books():
     """Get popular books with enhanced metadata"""
     try:
-        limit = min(int(request.args.get('limit', 20)), 50)
+        limit = max(min(int(request.args.get('limit', 20)), 50), 0)
         sort_by = request.args.get('sort', 'popularity')  # popularity, rating, recent
         
-        if sort_by == 'rating':
-            popular_books = data.nlargest(limit, 'rating')
-        elif sort_by == 'recent':
-            popular_books = data.nlargest(limit, 'year')
-        else:
-            popular_books = data.nlargest(limit, 'popularity_score')
-        
-        books = format_book_recommendations(popular_books, 'popular', 0.8)
-        
-        return jsonify({
-            'books': books,
-            'count': len(books),
-            'sort_by': sort_by
-        })
+        # The list only changes on reload; cache the known sorts (arbitrary values are echoed back)
+        if sort_by in ('popularity', 'rating', 'recent'):
+            return cached_json_response(('popular', sort_by, limit), lambda: build_popular_payload(sort_by, limit))
+        return ojsonify(build_popular_payload(sort_by, limit))
         
     except Exception as e:
-        print(f"❌ Error getting popular books: {e}")
-        return jsonify({'books': [], 'count': 0}), 500
+        logger.exception("❌ Error getting popular books")
+        return ojsonify({'books': [], 'count': 0}, 500)
 
 # PROTECTED ROUTES - Require authentication
 
@@ -1417,7 +1887,7 @@ def get_popular_books():
 def handle_favorites():
     """Enhanced favorites management"""
     if request.method == 'OPTIONS':
-        return jsonify({'status': 'ok'}), 200
+        return ojsonify({'status': 'ok'})
         
     try:
         # Check for authentication token
@@ -1433,7 +1903,7 @@ def handle_favorites():
         
         if request.method == 'POST':
             if not user_id:
-                return jsonify({'error': 'Authentication required'}), 401
+                return ojsonify({'error': 'Authentication required'}, 401)
                 
             data_req = request.json
             title = data_req.get('title')
@@ -1442,47 +1912,64 @@ def handle_favorites():
             genre = data_req.get('genre', '')
             rating = data_req.get('rating', 0)
             
+            if not isinstance(title, str) or not title.strip():
+                return ojsonify({'error': 'Book title is required'}, 400)
+            
             with get_db_connection() as conn:
-                # Check if already in favorites
-                existing = conn.execute(
-                    'SELECT id FROM favorites WHERE book_title = ? AND user_id = ?',
-                    (title, user_id)
+                # The unique (user_id, book_title_norm) index turns duplicates into a no-op with no row returned
+                inserted = conn.execute(
+                    '''INSERT INTO favorites 
+                       (book_title, book_author, book_image, timestamp, user_id) 
+                       VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT (user_id, book_title_norm) DO NOTHING
+                       RETURNING id''',
+                    (title, author, image, get_current_timestamp(), user_id)
                 ).fetchone()
                 
-                if existing:
-                    return jsonify({'error': 'Book already in favorites'}), 409
+                if inserted is None:
+                    return ojsonify({'error': 'Book already in favorites'}, 409)
                 
                 conn.execute(
-                    '''INSERT INTO favorites 
-                       (book_title, book_author, book_image, timestamp, user_id) 
-                       VALUES (?, ?, ?, ?, ?)''',
-                    (title, author, image, get_current_timestamp(), user_id)
+                    '''INSERT INTO favorite_counts (user_id, book_title, count)
+                       VALUES (?, ?, 1)
+                       ON CONFLICT (user_id, book_title) DO UPDATE SET count = count + 1''',
+                    (user_id, title)
                 )
                 conn.commit()
             
-            return jsonify({'success': True, 'message': 'Added to favorites'})
+            return ojsonify({'success': True, 'message': 'Added to favorites'})
             
         elif request.method == 'DELETE':
             if not user_id:
-                return jsonify({'error': 'Authentication required'}), 401
+                return ojsonify({'error': 'Authentication required'}, 401)
                 
             title = request.args.get('title')
             
             with get_db_connection() as conn:
                 result = conn.execute(
-                    'DELETE FROM favorites WHERE book_title = ? AND user_id = ?', 
-                    (title, user_id)
+                    'DELETE FROM favorites WHERE user_id = ? AND book_title_norm = lower(trim(?))', 
+                    (user_id, title)
                 )
+                if result.rowcount > 0:
+                    conn.execute(
+                        '''UPDATE favorite_counts SET count = count - ?
+                           WHERE user_id = ? AND lower(trim(book_title)) = lower(trim(?))''',
+                        (result.rowcount, user_id, title)
+                    )
+                    conn.execute(
+                        'DELETE FROM favorite_counts WHERE user_id = ? AND count <= 0',
+                        (user_id,)
+                    )
                 conn.commit()
                 
                 if result.rowcount == 0:
-                    return jsonify({'error': 'Book not found in favorites'}), 404
+                    return ojsonify({'error': 'Book not found in favorites'}, 404)
             
-            return jsonify({'success': True, 'message': 'Removed from favorites'})
+            return ojsonify({'success': True, 'message': 'Removed from favorites'})
             
         elif request.method == 'GET':
             if not user_id:
-                return jsonify([])  # Return empty array for unauthenticated users
+                return ojsonify([])  # Return empty array for unauthenticated users
             
             limit = min(int(request.args.get('limit', 50)), 100)
             
@@ -1495,24 +1982,20 @@ def handle_favorites():
                        LIMIT ?''',
                     (user_id, limit)
                 )
+                # Unpack the plain row tuples straight off the cursor; no intermediate fetchall() list
                 favorites = [
-                    {
-                        'title': row[0], 
-                        'author': row[1], 
-                        'image': row[2],
-                        'added_date': row[3]
-                    }
-                    for row in cursor.fetchall()
+                    {'title': title, 'author': author, 'image': image, 'added_date': added_date}
+                    for title, author, image, added_date in cursor
                 ]
             
-            return jsonify({
+            return ojsonify({
                 'favorites': favorites,
                 'count': len(favorites)
             })
             
     except Exception as e:
-        print(f"❌ Error in handle_favorites: {e}")
-        return jsonify({'success': False, 'message': str(e)}), 500
+        logger.exception("❌ Error in handle_favorites")
+        return ojsonify({'success': False, 'message': str(e)}, 500)
 
 @app.route('/api/rate', methods=['POST', 'OPTIONS'])
 @cross_origin()
@@ -1520,7 +2003,7 @@ def handle_favorites():
 def rate_book():
     """Enhanced book rating system"""
     if request.method == 'OPTIONS':
-        return jsonify({'status': 'ok'}), 200
+        return ojsonify({'status': 'ok'})
         
     try:
         user_id = request.current_user['user_id']
@@ -1531,36 +2014,84 @@ def rate_book():
         
         # Validate rating
         if not isinstance(rating, (int, float)) or rating < 1 or rating > 5:
-            return jsonify({'error': 'Rating must be between 1 and 5'}), 400
-        
-        with get_db_connection() as conn:
-            # Check if user has already rated this book
-            existing = conn.execute(
-                'SELECT id FROM ratings WHERE book_title = ? AND user_id = ?',
-                (title, user_id)
-            ).fetchone()
+            return ojsonify({'error': 'Rating must be between 1 and 5'}, 400)
+        
+        with get_db_connection() as conn, conn:
+            # Update the user's existing rating, if any
+            updated = conn.execute(
+                'UPDATE ratings SET rating = ?, timestamp = ? WHERE user_id = ? AND book_title_norm = lower(trim(?))',
+                (rating, get_current_timestamp(), user_id, title)
+            ).rowcount
             
-            if existing:
-                # Update existing rating
-                conn.execute(
-                    'UPDATE ratings SET rating = ?, timestamp = ? WHERE id = ?',
-                    (rating, get_current_timestamp(), existing[0])
-                )
+            if updated:
                 message = 'Rating updated successfully'
             else:
-                # Insert new rating
+                # Insert new rating; a concurrent insert of the same title turns into an update
                 conn.execute(
-                    'INSERT INTO ratings (book_title, rating, timestamp, user_id) VALUES (?, ?, ?, ?)',
+                    '''INSERT INTO ratings (book_title, rating, timestamp, user_id)
+                       VALUES (?, ?, ?, ?)
+                       ON CONFLICT (user_id, book_title_norm)
+                       DO UPDATE SET rating = excluded.rating, timestamp = excluded.timestamp''',
                     (title, rating, get_current_timestamp(), user_id)
                 )
                 message = 'Rating saved successfully'
+        
+        return ojsonify({'success': True, 'message': message})
+    except Exception as e:
+        logger.exception("❌ Error saving rating")
+        return ojsonify({'success': False, 'message': str(e)}, 500)
+
+@app.route('/api/ratings/bulk', methods=['POST', 'OPTIONS'])
+@cross_origin()
+@auth_required
+def rate_books_bulk():
+    """Save many ratings in a single transaction"""
+    if request.method == 'OPTIONS':
+        return ojsonify({'status': 'ok'})
+    
+    try:
+        user_id = request.current_user['user_id']
+        data_req = request.get_json(silent=True) or {}
+        items = data_req.get('ratings')
+        
+        if not isinstance(items, list) or not items:
+            return ojsonify({'error': 'A non-empty list of ratings is required'}, 400)
+        
+        if len(items) > 500:
+            return ojsonify({'error': 'At most 500 ratings can be saved at once'}, 400)
+        
+        timestamp = get_current_timestamp()
+        rows = []
+        for position, item in enumerate(items):
+            title = item.get('title') if isinstance(item, dict) else None
+            rating = item.get('rating') if isinstance(item, dict) else None
             
-            conn.commit()
+            if not title or not isinstance(rating, (int, float)) or rating < 1 or rating > 5:
+                return ojsonify({
+                    'error': f'Invalid rating at position {position}: needs a title and a rating between 1 and 5'
+                }, 400)
+            
+            rows.append((title, rating, timestamp, user_id))
+        
+        with get_db_connection() as conn, conn:
+            # Take the write lock up front: one transaction and one commit for the whole batch
+            conn.execute('BEGIN IMMEDIATE')
+            conn.executemany(
+                '''INSERT INTO ratings (book_title, rating, timestamp, user_id)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT (user_id, book_title_norm)
+                   DO UPDATE SET rating = excluded.rating, timestamp = excluded.timestamp''',
+                rows
+            )
         
-        return jsonify({'success': True, 'message': message})
+        return ojsonify({
+            'success': True,
+            'message': f'Saved {len(rows)} ratings',
+            'count': len(rows)
+        })
     except Exception as e:
-        print(f"❌ Error saving rating: {e}")
-        return jsonify({'success': False, 'message': str(e)}), 500
+        logger.exception("❌ Error saving bulk ratings")
+        return ojsonify({'success': False, 'message': str(e)}, 500)
 
 @app.route('/api/analytics', methods=['GET'])
 @cross_origin()
@@ -1571,12 +2102,28 @@ def get_analytics():
         user_id = request.current_user['user_id']
         
         with get_db_connection() as conn:
-            # Get user's favorite genres
+            # Cheap version token: row counts plus highest row ids change on every insert/delete
+            total_favorites, last_favorite_id, total_ratings, last_rating_id = conn.execute(
+                '''SELECT
+                       (SELECT COUNT(*) FROM favorites WHERE user_id = ?),
+                       (SELECT COALESCE(MAX(id), 0) FROM favorites WHERE user_id = ?),
+                       (SELECT COUNT(*) FROM ratings WHERE user_id = ?),
+                       (SELECT COALESCE(MAX(id), 0) FROM ratings WHERE user_id = ?)''',
+                (user_id, user_id, user_id, user_id)
+            ).fetchone()
+            
+            etag = f"{user_id}-{total_favorites}-{last_favorite_id}-{total_ratings}-{last_rating_id}"
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+            
+            # Get user's favorite genres from the rollup maintained by /api/favorites
             genre_stats = conn.execute(
-                '''SELECT book_title, COUNT(*) as count 
-                   FROM favorites 
+                '''SELECT book_title, count 
+                   FROM favorite_counts 
                    WHERE user_id = ? 
-                   GROUP BY book_title 
                    ORDER BY count DESC 
                    LIMIT 5''',
                 (user_id,)
@@ -1591,20 +2138,9 @@ def get_analytics():
                    ORDER BY date DESC 
                    LIMIT 30''',
                 (user_id,)
-            ).fetchall() if 'user_id' in [desc[0] for desc in conn.execute('PRAGMA table_info(searches)').fetchall()] else []
-            
-            # Get total stats
-            total_favorites = conn.execute(
-                'SELECT COUNT(*) FROM favorites WHERE user_id = ?',
-                (user_id,)
-            ).fetchone()[0]
-            
-            total_ratings = conn.execute(
-                'SELECT COUNT(*) FROM ratings WHERE user_id = ?',
-                (user_id,)
-            ).fetchone()[0]
+            ).fetchall() if searches_has_user_id else []
         
-        return jsonify({
+        response = ojsonify({
             'user_stats': {
                 'total_favorites': total_favorites,
                 'total_ratings': total_ratings,
@@ -1612,10 +2148,13 @@ def get_analytics():
                 'reading_activity': [{'date': row[0], 'searches': row[1]} for row in activity]
             }
         })
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
-        print(f"❌ Error getting analytics: {e}")
-        return jsonify({'error': str(e)}), 500
+        logger.exception("❌ Error getting analytics")
+        return ojsonify({'error': str(e)}, 500)
 
 @app.route('/api/search/suggestions')
 @cross_origin()
@@ -1627,13 +2166,13 @@ def search_suggestions():
         limit = min(int(request.args.get('limit', 10)), 20)
         
         if len(query) < 2:
-            return jsonify({'suggestions': []})
+            return ojsonify({'suggestions': []})
         
         # Get title suggestions
-        title_matches = data[data['title'].str.contains(query, case=False, na=False)]['title'].head(limit//2).tolist()
+        title_matches = [book_columns['title'][i] for i in islice(iter_containing(title_search, query.lower()), max(limit//2, 0))]
         
         # Get author suggestions
-        author_matches = data[data['author'].str.contains(query, case=False, na=False)]['author'].unique()[:limit//2].tolist()
+        author_matches = match_author_keys(query)[:limit//2]
         
         suggestions = []
         for title in title_matches:
@@ -1650,30 +2189,32 @@ def search_suggestions():
                 'category': 'Authors'
             })
         
-        return jsonify({
+        return ojsonify({
             'suggestions': suggestions[:limit],
             'count': len(suggestions[:limit])
         })
         
     except Exception as e:
-        print(f"❌ Error getting suggestions: {e}")
-        return jsonify({'suggestions': []})
-
-# Initialize database and load models SYNCHRONOUSLY
-init_db()
+        logger.exception("❌ Error getting suggestions")
+        return ojsonify({'suggestions': []})
 
-# CRITICAL: Load models synchronously before starting the server
-print("🚀 Starting BookQuest backend with SYNCHRONOUS MODEL LOADING...")
-load_models_sync()
+# Initialize database and load models SYNCHRONOUSLY; the schema bootstrap only touches
+# its own connection and searches_has_user_id, so it runs alongside the model build
+logger.info("🚀 Starting BookQuest backend with SYNCHRONOUS MODEL LOADING...")
+with ThreadPoolExecutor(max_workers=1) as startup_executor:
+    db_ready = startup_executor.submit(init_db)
+    # CRITICAL: Load models synchronously before starting the server
+    load_models_sync()
+    db_ready.result()
 
 # Production deployment configuration
 if __name__ == "__main__":
     port = int(os.environ.get('PORT', 5000))
     if models_loaded:
-        print("✅ Models loaded successfully - Flask app ready to serve!")
-        print(f"📊 Features: ML Recommendations ({len(data)} books), User Auth, Analytics, Google Books API")
-        print("🎯 No more threading issues - all operations are synchronous!")
+        logger.info("✅ Models loaded successfully - Flask app ready to serve!")
+        logger.info("📊 Features: ML Recommendations (%s books), User Auth, Analytics, Google Books API", len(data))
+        logger.info("🎯 No more threading issues - all operations are synchronous!")
     else:
-        print("❌ Models failed to load - Flask app running in limited mode")
+        logger.error("❌ Models failed to load - Flask app running in limited mode")
     
     app.run(debug=False, host='0.0.0.0', port=port, threaded=True)
@@ -0,0 +1,20 @@
+"""Gunicorn settings for serving the BookQuest API in production"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# Threaded workers overlap the blocking Google Books and SQLite calls without
+# monkey-patching; the analytics writer and DB pool already rely on real threads
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import app (and load or train the models) once in the master, then fork: workers
+# share the read-only NumPy/CSR buffers copy-on-write instead of each building its own.
+# Nothing opened at import survives into a request: the DB pool starts empty, and the
+# analytics writer thread is started lazily per process
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+keepalive = 5